@@ -3,21 +3,29 @@ import pandas as pd
 import requests
 import time
 from datetime import datetime
-from polygon import RESTClient
 from dotenv import load_dotenv
 
 # 加载 .env 文件
 load_dotenv()
 
-# 读取 API_KEY
-API_KEY = os.getenv("POLYGON_STOCK_API")
+_client = None
 
-# 检查 API_KEY 是否正确加载
-if not API_KEY:
-    raise ValueError("API Key 未找到，请在 .env 文件中设置 POLYGON_STOCK_API")
+def get_client():
+    """按需初始化 Polygon.io 客户端，缺少 API_KEY 时在首次使用时才报错"""
+    global _client
+    if _client is None:
+        from polygon import RESTClient
 
-# 初始化 Polygon.io 客户端
-client = RESTClient(api_key=API_KEY)
+        # 读取 API_KEY
+        api_key = os.getenv("POLYGON_STOCK_API")
+
+        # 检查 API_KEY 是否正确加载
+        if not api_key:
+            raise ValueError("API Key 未找到，请在 .env 文件中设置 POLYGON_STOCK_API")
+
+        # 初始化 Polygon.io 客户端
+        _client = RESTClient(api_key=api_key)
+    return _client
 
 def get_sp500_from_wiki_api():
     """使用wikitable2json API获取标普500成分股"""
@@ -64,7 +72,7 @@ def get_company_details(ticker):
     for attempt in range(MAX_RETRIES):
         try:
             # 获取公司详细信息
-            details = client.get_ticker_details(ticker)
+            details = get_client().get_ticker_details(ticker)
             
             # 提取所需信息
             company_info = {
@@ -95,6 +103,9 @@ def get_company_details(ticker):
 
 # 主执行流程
 if __name__ == "__main__":
+    # 缺少 API_KEY 时立即报错，而不是在每次请求的重试中失败
+    get_client()
+
     print("正在获取标普500成分股数据...")
     
     # 获取标普500成分股
@@ -1,20 +1,28 @@
 import os
 import pandas as pd
-from polygon import RESTClient
 from dotenv import load_dotenv
 
 # 加载 .env 文件
 load_dotenv()
 
-# 读取 API_KEY
-API_KEY = os.getenv("POLYGON_STOCK_API")
+_client = None
 
-# 检查 API_KEY 是否正确加载
-if not API_KEY:
-    raise ValueError("API Key 未找到，请在 .env 文件中设置 POLYGON_STOCK_API")
+def get_client():
+    """按需初始化 Polygon.io 客户端，缺少 API_KEY 时在首次使用时才报错"""
+    global _client
+    if _client is None:
+        from polygon import RESTClient
 
-# 初始化 Polygon.io 客户端
-client = RESTClient(api_key=API_KEY)
+        # 读取 API_KEY
+        api_key = os.getenv("POLYGON_STOCK_API")
+
+        # 检查 API_KEY 是否正确加载
+        if not api_key:
+            raise ValueError("API Key 未找到，请在 .env 文件中设置 POLYGON_STOCK_API")
+
+        # 初始化 Polygon.io 客户端
+        _client = RESTClient(api_key=api_key)
+    return _client
 
 def get_low_price_stocks(date_str):
     """
@@ -26,7 +34,7 @@ def get_low_price_stocks(date_str):
 
     try:
         # 获取指定日期的股票数据
-        response = client.get_grouped_daily_aggs(locale="us", market_type="stocks", date=date_str)
+        response = get_client().get_grouped_daily_aggs(locale="us", market_type="stocks", date=date_str)
 
         # 遍历返回的数据
         for stock in response:
@@ -0,0 +1,238 @@
+import numpy as np
+import pandas as pd
+
+from network_builder import W_TEXT, W_SIC, W_MARKET, THRESHOLD, normalize_rows, combine_similarity
+
+# 市值分桶宽度（以 log10 市值计，0.5 表示半个数量级）
+BUCKET_WIDTH = 0.5
+
+# 上界比较时留出的浮点误差余量，保证剪枝不会误删真实的边
+BOUND_SLACK = 1e-6
+
+# 存活候选对超过全部股票对的该比例时，剪枝已无收益，直接做一次稠密计算
+DENSE_FRACTION = 0.5
+
+
+def min_text_similarity(weights=(W_TEXT, W_SIC, W_MARKET), threshold=THRESHOLD, same_sic=False, max_market=1.0,
+                        max_return=1.0):
+    """
+    由权重和阈值推导文本相似度的下界：低于该值的股票对不可能成为边
+    combined = w_text * text + w_sic * sic + w_market * market (+ w_return * return) > threshold
+    :param same_sic: bool, 两家公司 SIC 代码是否相同
+    :param max_market: float, 市值相似度能达到的最大值
+    :param max_return: float, 收益率相似度能达到的最大值（仅在 weights 含第四项时使用）
+    :return: float
+    """
+    w_text, w_sic, w_market = weights[:3]
+    w_return = weights[3] if len(weights) > 3 else 0.0
+    return (threshold - w_sic * float(same_sic) - w_market * max_market - w_return * max_return) / w_text
+
+
+def assign_blocks(df, max_cap, bucket_width=BUCKET_WIDTH):
+    """
+    按 SIC 代码和 log10 市值分桶给公司分块
+    :return: np.ndarray, 每家公司的块编号；以及每块的 (sic_code, 归一化市值下界, 上界) 表
+    """
+    caps = df['market_cap'].fillna(0).to_numpy(dtype=float)
+    buckets = np.full(len(df), -1, dtype=np.int64)
+    positive = caps > 0
+    buckets[positive] = np.floor(np.log10(caps[positive]) / bucket_width).astype(np.int64)
+
+    # SIC 缺失时与任何公司都不相同，用 NaN 作为独立分组键
+    keys = pd.DataFrame({'sic': df['sic_code'].to_numpy(dtype=float), 'bucket': buckets})
+    block_ids = keys.groupby(['sic', 'bucket'], dropna=False, sort=False).ngroup().to_numpy()
+
+    norm_caps = caps / max_cap
+    blocks = pd.DataFrame({'block': block_ids, 'sic': keys['sic'], 'cap': norm_caps})
+    table = blocks.groupby('block').agg(sic=('sic', 'first'), cap_lo=('cap', 'min'), cap_hi=('cap', 'max'))
+    return block_ids, table
+
+
+def block_geometry(unit_emb, block_ids, num_blocks):
+    """
+    计算每块嵌入的中心方向和角半径（块内任意向量与中心方向的最大夹角）
+    含零向量的块无法用角度约束，半径记为 pi，即不做文本剪枝
+    """
+    dim = unit_emb.shape[1]
+    sums = np.zeros((num_blocks, dim))
+    np.add.at(sums, block_ids, unit_emb)
+    centroids = normalize_rows(sums)
+
+    cos_to_center = np.einsum('ij,ij->i', unit_emb, centroids[block_ids])
+    angles = np.arccos(np.clip(cos_to_center, -1.0, 1.0))
+    angles[np.linalg.norm(unit_emb, axis=1) == 0] = np.pi
+    radius = np.zeros(num_blocks)
+    np.maximum.at(radius, block_ids, angles)
+    radius[np.linalg.norm(centroids, axis=1) == 0] = np.pi
+    return centroids, radius
+
+
+def _block_members(block_ids, num_blocks):
+    """
+    按块编号排序的行下标，以及每块在其中的起始位置和大小
+    :return: (order, starts, sizes)，第 k 块的成员为 order[starts[k]:starts[k] + sizes[k]]
+    """
+    order = np.argsort(block_ids, kind='stable')
+    sizes = np.bincount(block_ids, minlength=num_blocks)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    return order, starts, sizes
+
+
+def _gather_blocks(order, starts, sizes, blocks):
+    """将若干块的成员拼接为一个下标数组（向量化，不逐块循环）"""
+    lengths = sizes[blocks]
+    offsets = np.repeat(starts[blocks] - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return order[offsets + np.arange(lengths.sum())]
+
+
+def generate_candidates(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap,
+                        weights=(W_TEXT, W_SIC, W_MARKET), threshold=THRESHOLD, bucket_width=BUCKET_WIDTH,
+                        sim_return=None):
+    """
+    精确的候选对生成：按 (SIC, 市值桶) 分块，利用上界剔除不可能成为边的块对，
+    只对剩余股票对计算综合相似度
+    :param sim_return: np.ndarray, 可选的收益率相似度矩阵（取值 [0, 1]），需要 weights 含第四项
+    :return: (rows, cols, scores, stats)，rows/cols 为超过阈值的股票对下标
+    """
+    w_text, w_sic, w_market = weights[:3]
+    w_return = weights[3] if sim_return is not None else 0.0
+    unit_a = normalize_rows(np.asarray(nasdaq_emb, dtype=float))
+    unit_b = normalize_rows(np.asarray(low_emb, dtype=float))
+
+    blocks_a, table_a = assign_blocks(nasdaq_df, max_cap, bucket_width)
+    blocks_b, table_b = assign_blocks(low_df, max_cap, bucket_width)
+    cent_a, rad_a = block_geometry(unit_a, blocks_a, len(table_a))
+    cent_b, rad_b = block_geometry(unit_b, blocks_b, len(table_b))
+
+    # 块对之间的上界：SIC 是否相同、市值相似度最大值、文本相似度最大值
+    sic_a = table_a['sic'].to_numpy()
+    sic_b = table_b['sic'].to_numpy()
+    same_sic = (sic_a[:, None] == sic_b[None, :]).astype(float)
+
+    lo_a, hi_a = table_a['cap_lo'].to_numpy(), table_a['cap_hi'].to_numpy()
+    lo_b, hi_b = table_b['cap_lo'].to_numpy(), table_b['cap_hi'].to_numpy()
+    gap = np.maximum(0, np.maximum(lo_b[None, :] - hi_a[:, None], lo_a[:, None] - hi_b[None, :]))
+    max_market = 1 - gap
+
+    center_angle = np.arccos(np.clip(cent_a @ cent_b.T, -1.0, 1.0))
+    min_angle = np.maximum(0, center_angle - rad_a[:, None] - rad_b[None, :])
+    max_text = np.cos(min_angle)
+
+    # 收益率相似度不参与分块，按其最大值 1 计入上界
+    upper = w_text * max_text + w_sic * same_sic + w_market * max_market + w_return
+    survive_a, survive_b = np.nonzero(upper > threshold - BOUND_SLACK)
+
+    # 对每个 A 侧块，把所有存活的 B 侧块拼在一起做一次稠密矩阵乘法，再在块上逐对判断
+    order_a, starts_a, sizes_a = _block_members(blocks_a, len(table_a))
+    order_b, starts_b, sizes_b = _block_members(blocks_b, len(table_b))
+    sic_rows = nasdaq_df['sic_code'].to_numpy(dtype=float)
+    sic_cols = low_df['sic_code'].to_numpy(dtype=float)
+    cap_rows = nasdaq_df['market_cap'].fillna(0).to_numpy(dtype=float) / max_cap
+    cap_cols = low_df['market_cap'].fillna(0).to_numpy(dtype=float) / max_cap
+
+    scored = int((sizes_a[survive_a] * sizes_b[survive_b]).sum())
+    stats = {
+        'total_pairs': len(nasdaq_df) * len(low_df),
+        'block_pairs': int(upper.size),
+        'surviving_block_pairs': int(len(survive_a)),
+        'candidate_pairs': scored,
+        'dense_fallback': scored > DENSE_FRACTION * len(nasdaq_df) * len(low_df),
+        'global_text_bound': min_text_similarity(weights, threshold, same_sic=False),
+        'same_sic_text_bound': min_text_similarity(weights, threshold, same_sic=True),
+    }
+    if stats['dense_fallback']:
+        # 各向异性的 BERT 嵌入下几乎没有块对能被剪掉
+        full = combine_similarity(unit_a @ unit_b.T, nasdaq_df, low_df, max_cap, weights, sim_return)
+        rows, cols = np.nonzero(full > threshold)
+        return rows, cols, full[rows, cols], stats
+
+    keep_rows, keep_cols, keep_scores = [], [], []
+    boundaries = np.flatnonzero(np.diff(survive_a)) + 1
+    for group in np.split(np.arange(len(survive_a)), boundaries):
+        if not len(group):
+            continue
+        a = survive_a[group[0]]
+        ia = order_a[starts_a[a]:starts_a[a] + sizes_a[a]]
+        ib = _gather_blocks(order_b, starts_b, sizes_b, survive_b[group])
+        scores = w_text * (unit_a[ia] @ unit_b[ib].T)
+        scores += w_sic * (sic_rows[ia][:, None] == sic_cols[ib][None, :])
+        scores += w_market * (1 - np.abs(cap_rows[ia][:, None] - cap_cols[ib][None, :]))
+        if sim_return is not None:
+            scores += w_return * sim_return[np.ix_(ia, ib)]
+        r, c = np.nonzero(scores > threshold)
+        keep_rows.append(ia[r])
+        keep_cols.append(ib[c])
+        keep_scores.append(scores[r, c])
+
+    if not keep_rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), stats
+    return np.concatenate(keep_rows), np.concatenate(keep_cols), np.concatenate(keep_scores), stats
+
+
+def verify_against_exhaustive(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap,
+                              weights=(W_TEXT, W_SIC, W_MARKET), threshold=THRESHOLD, sim_return=None):
+    """
+    校验剪枝后的边集合与全量计算完全一致
+    :return: bool
+    """
+    rows, cols, scores, stats = generate_candidates(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap,
+                                                    weights, threshold, sim_return=sim_return)
+    sim_text = normalize_rows(nasdaq_emb) @ normalize_rows(low_emb).T
+    full = combine_similarity(sim_text, nasdaq_df, low_df, max_cap, weights, sim_return)
+    full_rows, full_cols = np.nonzero(full > threshold)
+
+    pruned_edges = set(zip(rows.tolist(), cols.tolist()))
+    full_edges = set(zip(full_rows.tolist(), full_cols.tolist()))
+    weights_match = np.allclose(scores, full[rows, cols], rtol=0, atol=1e-9)
+
+    print(f"全部股票对: {stats['total_pairs']}, 候选对: {stats['candidate_pairs']}, "
+          f"存活块对: {stats['surviving_block_pairs']} / {stats['block_pairs']}"
+          f"{'（改用稠密计算）' if stats['dense_fallback'] else ''}")
+    print(f"剪枝结果边数: {len(pruned_edges)}, 全量计算边数: {len(full_edges)}")
+    return pruned_edges == full_edges and weights_match
+
+
+if __name__ == "__main__":
+    from network_builder import NASDAQ_PATH, LOW_PRICE_PATH, load_companies, market_cap_scale
+
+    nasdaq_df = load_companies(NASDAQ_PATH, 'nasdaq100')
+    low_df = load_companies(LOW_PRICE_PATH, 'lowprice')
+    max_cap = market_cap_scale(nasdaq_df, low_df)
+
+    # 使用按 SIC 聚类的随机嵌入做自检，无需加载 BERT
+    rng = np.random.default_rng(42)
+    sic_all = pd.concat([nasdaq_df['sic_code'], low_df['sic_code']]).fillna(-1).to_numpy()
+    centers = {sic: rng.normal(size=64) for sic in np.unique(sic_all)}
+    emb = np.vstack([centers[sic] + 0.3 * rng.normal(size=64) for sic in sic_all])
+    nasdaq_emb, low_emb = emb[:len(nasdaq_df)], emb[len(nasdaq_df):]
+
+    print(f"文本相似度下界（SIC 不同）: {min_text_similarity(same_sic=False):.4f}")
+    print(f"文本相似度下界（SIC 相同）: {min_text_similarity(same_sic=True):.4f}")
+    ok = verify_against_exhaustive(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap)
+    print("边集合一致" if ok else "边集合不一致！")
+
+    # 加入随机的收益率相似度作为第四项再校验一次
+    from network_builder import RETURN_WEIGHTS
+
+    sim_return = rng.uniform(0, 1, size=(len(nasdaq_df), len(low_df)))
+    ok = verify_against_exhaustive(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap,
+                                   RETURN_WEIGHTS, sim_return=sim_return)
+    print("边集合一致（含收益率项）" if ok else "边集合不一致（含收益率项）！")
+
+    # 不按 SIC 聚类、各向异性的嵌入（与 BERT 平均池化相近：共享一个主方向，中位余弦约 0.9），
+    # 几乎没有块对能被剪掉，此时应退回稠密计算，耗时与全量计算相当
+    import time
+
+    common = rng.normal(size=64)
+    emb = 3 * common + rng.normal(size=(len(sic_all), 64))
+    nasdaq_emb, low_emb = emb[:len(nasdaq_df)], emb[len(nasdaq_df):]
+    ok = verify_against_exhaustive(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap)
+    print("边集合一致（各向异性嵌入）" if ok else "边集合不一致（各向异性嵌入）！")
+    start = time.perf_counter()
+    generate_candidates(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap)
+    pruned_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    full = combine_similarity(normalize_rows(nasdaq_emb) @ normalize_rows(low_emb).T, nasdaq_df, low_df, max_cap)
+    np.nonzero(full > THRESHOLD)
+    print(f"剪枝路径耗时: {pruned_seconds:.3f} 秒, 全量计算耗时: {time.perf_counter() - start:.3f} 秒")
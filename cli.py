@@ -0,0 +1,385 @@
+"""
+统一命令行入口：fetch → union → build → analyse
+
+    python cli.py fetch-ndx | fetch-sp100 | fetch-lowprice [DATE]
+    python cli.py union | weekly-union
+    python cli.py build [--backend ...] | update SNAPSHOT
+    python cli.py render | visualize | interactive
+    python cli.py communities | bridges | query TICKER | serve
+    python cli.py snapshot GRAPHML DATE | diff OLD_DATE NEW_DATE
+    python cli.py startup-bench
+    python cli.py --profile build ... | profile-compare A.json B.json
+
+顶层只导入标准库，pandas / torch / transformers / matplotlib 等重型依赖在子命令执行时才导入，
+因此 --help、数据抓取和纯分析类子命令不会加载 torch、transformers 或 matplotlib。
+"""
+import argparse
+import os
+import runpy
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 默认路径与 network_builder 保持一致；这里不导入 network_builder，以免 --help 时加载 pandas
+DEFAULTS = {
+    'nasdaq': "union_NDX_and_SP100/merged_indices_2025-03-10.csv",
+    'low_price': "low_price_company_info/final_union_by_ticker.csv",
+    'graph': "nasdaq_lowprice_network.graphml",
+    'cache': "embedding_cache.npz",
+    'calibration': "text_calibration.npz",
+    'threshold': 0.6,
+}
+
+# 启动耗时测量中关注的重型模块
+HEAVY_MODULES = ('torch', 'transformers', 'matplotlib', 'pandas', 'networkx', 'polygon')
+
+
+def run_script(path, argv=(), cwd=None):
+    """以 __main__ 方式运行已有脚本，必要时切换工作目录（脚本内使用相对路径）"""
+    old_argv, old_cwd = sys.argv, os.getcwd()
+    sys.argv = [path] + list(argv)
+    if cwd:
+        os.chdir(cwd)
+    try:
+        runpy.run_path(os.path.join(ROOT, path), run_name="__main__")
+    finally:
+        sys.argv = old_argv
+        os.chdir(old_cwd)
+
+
+def cmd_fetch_ndx(args):
+    run_script("access2NDXcompany.py", cwd=os.path.join(ROOT, "NDX_company_info"))
+
+
+def cmd_fetch_sp100(args):
+    run_script("access2SP100company.py", cwd=os.path.join(ROOT, "S&P100_company_info"))
+
+
+def cmd_fetch_lowprice(args):
+    run_script("access2lowpricecompany.py", [args.date] if args.date else [],
+               cwd=os.path.join(ROOT, "low_price_company_info"))
+
+
+def cmd_union(args):
+    from union_NDX_and_SP100.union_company import merge_index_companies
+
+    old_cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        # 输入路径相对于仓库根目录，输出写到 build 默认读取的位置
+        merge_index_companies(DEFAULTS['nasdaq'])
+    finally:
+        os.chdir(old_cwd)
+
+
+def cmd_weekly_union(args):
+    # 与 fetch-lowprice 相同的工作目录：processcompanyby1week.py 从当前目录读取 low_price_companies_*.csv
+    run_script("low_price_company_info/processcompanyby1week.py", cwd=os.path.join(ROOT, "low_price_company_info"))
+
+
+def cmd_build(args):
+    import networkx as nx
+    from network_builder import build_network
+    from profiling import profile_stage
+
+    G = build_network(args.nasdaq, args.low_price, args.cache, args.threshold, use_pruning=args.pruning,
+                      text_backend=args.backend, precision=args.precision, history_paths=args.history,
+                      collapse_share_classes=args.collapse_share_classes, calibration_path=args.calibration)
+    print(f"图网络信息: 节点数量 = {G.number_of_nodes()}, 边的数量 = {G.number_of_edges()}")
+    with profile_stage("write_graphml"):
+        nx.write_graphml(G, args.output)
+    print(f"网络已保存到 {args.output}")
+    if args.snapshot_date:
+        from network_diff import snapshot_network
+
+        path, _ = snapshot_network(G, args.snapshot_date)
+        print(f"边快照已保存到 {path}")
+
+
+def cmd_calibrate(args):
+    from network_builder import load_companies, market_cap_scale
+    from text_backends import calibrate_backend, evaluate_backend_agreement, print_agreement
+
+    nasdaq_df = load_companies(args.nasdaq, 'nasdaq100')
+    low_df = load_companies(args.low_price, 'lowprice')
+    calibrate_backend(nasdaq_df, low_df, args.backend, args.reference, args.cache, args.calibration)
+    print(f"{args.backend} → {args.reference} 校准映射已保存到 {args.calibration}")
+    results = evaluate_backend_agreement(nasdaq_df, low_df, market_cap_scale(nasdaq_df, low_df), args.backend,
+                                         args.reference, cache_path=args.cache, calibration_path=args.calibration)
+    print_agreement(results, args.backend, args.reference)
+
+
+def cmd_update(args):
+    from incremental_update import update_network
+
+    G = update_network(args.snapshot, args.graph, args.nasdaq, args.cache, args.output, args.threshold)
+    if args.snapshot_date:
+        from network_diff import snapshot_network
+
+        path, _ = snapshot_network(G, args.snapshot_date)
+        print(f"边快照已保存到 {path}")
+
+
+def cmd_render(args):
+    import networkx as nx
+    from community_detection import threshold_subgraph
+    from render_network import render_network_headless
+
+    source = nx.read_graphml(args.graph)
+    G = threshold_subgraph(source, args.threshold)
+    print(f"过滤后的图: 节点数量: {G.number_of_nodes()}, 边数量: {G.number_of_edges()}")
+    render_network_headless(G, args.output, top_n_labels=args.labels,
+                            rasterize_edges_above=args.rasterize_edges_above, dpi=args.dpi,
+                            title=f"NASDAQ高相似度股票网络\n(相似度 > {args.threshold})",
+                            source_graph=source, threshold=args.threshold)
+
+
+def cmd_visualize(args):
+    run_script("testgraph.py", ["--headless"] if args.headless else [], cwd=ROOT)
+
+
+def cmd_interactive(args):
+    run_script("testgraph2.py", cwd=ROOT)
+
+
+def cmd_communities(args):
+    import networkx as nx
+    from community_detection import detect_communities_grid, partition_stability, print_grid_report
+
+    G = nx.read_graphml(args.graph)
+    results = detect_communities_grid(G, args.thresholds, args.resolutions, args.workers)
+    print_grid_report(results, partition_stability(results, args.thresholds, args.resolutions))
+
+
+def cmd_bridges(args):
+    import networkx as nx
+    from community_detection import cached_best_partition, threshold_subgraph
+    from community_structure import community_structure, rank_bridge_nodes
+
+    # 分区按 (原图, 阈值) 缓存，与 communities 网格共用
+    source = nx.read_graphml(args.graph)
+    G = threshold_subgraph(source, args.threshold)
+    structure = community_structure(G, cached_best_partition(source, args.threshold))
+    print("关键桥接节点 (连接多个社区):")
+    for node, reached, participation in rank_bridge_nodes(structure, args.top):
+        print(f"{node}: 连接 {reached} 个社区, 参与系数 {participation:.3f} ({G.nodes[node].get('source')})")
+
+
+def cmd_query(args):
+    from query_service import SimilarityIndex, query_once
+
+    index = SimilarityIndex.load(args.graph)
+    return query_once(index, args.ticker, args.k, args.source)
+
+
+def cmd_serve(args):
+    from query_service import SimilarityIndex, serve
+
+    serve(SimilarityIndex.load(args.graph), args.host, args.port)
+
+
+def cmd_snapshot(args):
+    from network_diff import snapshot_graphml
+
+    path, snapshot = snapshot_graphml(args.graph, args.date)
+    print(f"快照已保存到 {path}: {len(snapshot['nodes'])} 个节点, {len(snapshot['keys'])} 条边")
+
+
+def cmd_diff(args):
+    from network_diff import diff_dates, load_ticker_ids, print_diff
+
+    path, diff = diff_dates(args.old_date, args.new_date)
+    print_diff(diff, load_ticker_ids(), args.top)
+    print(f"\n差异已保存到 {path}")
+
+
+def cmd_profile_compare(args):
+    from profiling import compare_reports
+
+    compare_reports(args.report_a, args.report_b)
+
+
+def _cold_start(command):
+    """在新的子进程中运行命令，返回 (耗时秒数, 加载到的重型模块列表, 是否成功)"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime"] + command, capture_output=True, text=True, cwd=ROOT)
+    elapsed = time.perf_counter() - start
+    imported = {line.rsplit('|', 1)[-1].strip().split('.')[0] for line in result.stderr.splitlines()
+                if line.startswith('import time:')}
+    return elapsed, [module for module in HEAVY_MODULES if module in imported], result.returncode == 0
+
+
+def cmd_startup_bench(args):
+    """
+    测量每个子命令的冷启动耗时：
+    1. --help：只解析参数，不应加载任何重型模块
+    2. 导入：子命令执行前需要导入的全部模块（不实际运行），反映真实的启动开销
+    """
+    elapsed, heavy, _ = _cold_start([os.path.abspath(__file__), "--help"])
+    print(f"{'--help':<16} {elapsed * 1000:8.1f} ms  重型模块: {', '.join(heavy) or '无'}")
+    for name in sorted(COMMANDS):
+        help_elapsed, help_heavy, _ = _cold_start([os.path.abspath(__file__), name, "--help"])
+        modules = COMMAND_MODULES.get(name, ())
+        code = "; ".join(f"import {module}" for module in modules) or "pass"
+        import_elapsed, import_heavy, ok = _cold_start(["-c", code])
+        print(f"{name:<16} --help {help_elapsed * 1000:8.1f} ms (重型模块: {', '.join(help_heavy) or '无'})  "
+              f"导入 {import_elapsed * 1000:8.1f} ms (重型模块: {', '.join(import_heavy) or '无'})"
+              f"{'' if ok else '  [导入失败，缺少依赖]'}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="纳斯达克100与低价股关系网络流水线")
+    parser.add_argument("--profile", action="store_true", help="记录各阶段耗时与内存，退出时写出报告")
+    parser.add_argument("--profile-dir", default="profiles", help="性能报告输出目录")
+    parser.add_argument("--cprofile", action="store_true", help="同时为每个顶层阶段输出 cProfile 结果")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("fetch-ndx", help="抓取纳斯达克100成分股公司信息")
+    subparsers.add_parser("fetch-sp100", help="抓取标普100成分股公司信息")
+    p = subparsers.add_parser("fetch-lowprice", help="抓取指定日期收盘价低于 10 美元的公司信息")
+    p.add_argument("date", nargs="?", help="日期 YYYY-MM-DD")
+
+    subparsers.add_parser("union", help="合并标普100与纳斯达克100公司信息")
+    subparsers.add_parser("weekly-union", help="合并一周的低价股快照")
+
+    p = subparsers.add_parser("build", help="构建关系网络 GraphML")
+    p.add_argument("--nasdaq", default=DEFAULTS['nasdaq'])
+    p.add_argument("--low-price", default=DEFAULTS['low_price'])
+    p.add_argument("--cache", default=DEFAULTS['cache'])
+    p.add_argument("--threshold", type=float, default=DEFAULTS['threshold'])
+    p.add_argument("--backend", default="bert", choices=("bert", "tfidf", "hashing"))
+    p.add_argument("--calibration", default=DEFAULTS['calibration'], help="tfidf / hashing 后端的校准文件")
+    p.add_argument("--precision", default="float64", choices=("float64", "float32", "float16", "int8"))
+    p.add_argument("--pruning", action="store_true", help="使用上界剪枝生成候选对")
+    p.add_argument("--history", nargs="*", default=None, help="历史数据 CSV，加入收益率相关性")
+    p.add_argument("--collapse-share-classes", action="store_true",
+                   help="将同一发行人的普通股、认股权证、单位等折叠为一个节点")
+    p.add_argument("--snapshot-date", default=None, help="同时写出该日期的边快照，供 diff 使用")
+    p.add_argument("--output", default=DEFAULTS['graph'])
+
+    p = subparsers.add_parser("calibrate", help="将 tfidf / hashing 后端的相似度校准到 BERT 尺度（需要 BERT 嵌入）")
+    p.add_argument("--backend", default="hashing", choices=("tfidf", "hashing"))
+    p.add_argument("--reference", default="bert", choices=("bert", "tfidf", "hashing"))
+    p.add_argument("--nasdaq", default=DEFAULTS['nasdaq'])
+    p.add_argument("--low-price", default=DEFAULTS['low_price'])
+    p.add_argument("--cache", default=DEFAULTS['cache'])
+    p.add_argument("--calibration", default=DEFAULTS['calibration'])
+
+    p = subparsers.add_parser("update", help="用新的每日快照增量更新网络")
+    p.add_argument("snapshot")
+    p.add_argument("--graph", default=DEFAULTS['graph'])
+    p.add_argument("--nasdaq", default=DEFAULTS['nasdaq'])
+    p.add_argument("--cache", default=DEFAULTS['cache'])
+    p.add_argument("--output", default=None)
+    p.add_argument("--threshold", type=float, default=None, help="边阈值（默认沿用建图时的阈值，不同时全量重建）")
+    p.add_argument("--snapshot-date", default=None, help="同时写出该日期的边快照，供 diff 使用")
+
+    p = subparsers.add_parser("render", help="无界面绘制高相似度网络（PNG / PDF / SVG）")
+    p.add_argument("--graph", default=DEFAULTS['graph'])
+    p.add_argument("--threshold", type=float, default=0.95)
+    p.add_argument("--output", default="high_similarity_nasdaq_network.png", help="按扩展名选择输出格式")
+    p.add_argument("--labels", type=int, default=30)
+    p.add_argument("--dpi", type=int, default=150)
+    p.add_argument("--rasterize-edges-above", type=int, default=2000, help="矢量输出时边数超过该值则栅格化边集合")
+
+    p = subparsers.add_parser("visualize", help="运行 testgraph.py")
+    p.add_argument("--headless", action="store_true")
+    subparsers.add_parser("interactive", help="运行 testgraph2.py 生成交互式网页")
+
+    p = subparsers.add_parser("communities", help="多阈值、多分辨率社区检测")
+    p.add_argument("--graph", default=DEFAULTS['graph'])
+    p.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.8, 0.9, 0.93, 0.95])
+    p.add_argument("--resolutions", type=float, nargs="+", default=[0.5, 1.0, 1.5, 2.0])
+    p.add_argument("--workers", type=int, default=None)
+
+    p = subparsers.add_parser("bridges", help="社区结构与桥接节点分析")
+    p.add_argument("--graph", default=DEFAULTS['graph'])
+    p.add_argument("--threshold", type=float, default=0.6)
+    p.add_argument("--top", type=int, default=5)
+
+    p = subparsers.add_parser("query", help="查询相似公司")
+    p.add_argument("ticker")
+    p.add_argument("-k", type=int, default=10)
+    p.add_argument("--source", choices=("nasdaq100", "lowprice"))
+    p.add_argument("--graph", default=DEFAULTS['graph'])
+
+    p = subparsers.add_parser("serve", help="启动相似公司 HTTP 查询服务")
+    p.add_argument("--graph", default=DEFAULTS['graph'])
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+
+    p = subparsers.add_parser("snapshot", help="将某天的 GraphML 编码为边快照")
+    p.add_argument("graph")
+    p.add_argument("date", help="快照日期 YYYY-MM-DD")
+    p = subparsers.add_parser("diff", help="比较两天的网络：新增、删除、权重变化的边与节点变动")
+    p.add_argument("old_date")
+    p.add_argument("new_date")
+    p.add_argument("--top", type=int, default=10)
+
+    subparsers.add_parser("startup-bench", help="测量各子命令的冷启动耗时")
+    p = subparsers.add_parser("profile-compare", help="比较两次运行的性能报告")
+    p.add_argument("report_a")
+    p.add_argument("report_b")
+    return parser
+
+
+COMMANDS = {
+    'fetch-ndx': cmd_fetch_ndx,
+    'fetch-sp100': cmd_fetch_sp100,
+    'fetch-lowprice': cmd_fetch_lowprice,
+    'union': cmd_union,
+    'weekly-union': cmd_weekly_union,
+    'build': cmd_build,
+    'calibrate': cmd_calibrate,
+    'update': cmd_update,
+    'render': cmd_render,
+    'visualize': cmd_visualize,
+    'interactive': cmd_interactive,
+    'communities': cmd_communities,
+    'bridges': cmd_bridges,
+    'query': cmd_query,
+    'serve': cmd_serve,
+    'snapshot': cmd_snapshot,
+    'diff': cmd_diff,
+    'startup-bench': cmd_startup_bench,
+    'profile-compare': cmd_profile_compare,
+}
+
+
+# 各子命令执行时导入的模块，供 startup-bench 测量导入开销
+COMMAND_MODULES = {
+    'fetch-ndx': ('access2NDXcompany',),
+    'fetch-sp100': ('access2SP100company',),
+    'fetch-lowprice': ('access2lowpricecompany',),
+    'union': ('union_NDX_and_SP100.union_company',),
+    'weekly-union': ('pandas',),
+    'build': ('networkx', 'network_builder', 'text_backends'),
+    'calibrate': ('network_builder', 'text_backends'),
+    'update': ('incremental_update',),
+    'render': ('networkx', 'community_detection', 'render_network'),
+    'visualize': ('networkx', 'matplotlib.pyplot', 'community_detection'),
+    'interactive': ('networkx', 'pyvis.network', 'community_detection'),
+    'communities': ('networkx', 'community_detection'),
+    'bridges': ('networkx', 'community_detection', 'community_structure'),
+    'query': ('query_service',),
+    'serve': ('query_service',),
+    'snapshot': ('network_diff',),
+    'diff': ('network_diff',),
+    'profile-compare': ('profiling',),
+}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile or args.cprofile:
+        from profiling import enable_profiling
+
+        enable_profiling(args.profile_dir, cprofile=args.cprofile)
+    # 子命令可以返回非零退出码（如 query 查不到股票）
+    return COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import networkx as nx
+from community import community_louvain
+
+from profiling import profiled
+
+GRAPH_PATH = "nasdaq_lowprice_network.graphml"
+CACHE_DIR = "community_cache"
+
+# 默认参数网格：边权重阈值与 Louvain 分辨率
+THRESHOLDS = (0.6, 0.8, 0.9, 0.93, 0.95)
+RESOLUTIONS = (0.5, 1.0, 1.5, 2.0)
+RANDOM_STATE = 42
+
+
+def graph_fingerprint(G):
+    """图的稳定指纹：对排序后的 (u, v, weight) 边列表和节点列表做哈希"""
+    digest = hashlib.sha1()
+    for node in sorted(map(str, G.nodes())):
+        digest.update(node.encode('utf-8') + b'\0')
+    edges = sorted((min(str(u), str(v)), max(str(u), str(v)), round(float(d.get('weight', 1.0)), 6))
+                   for u, v, d in G.edges(data=True))
+    for u, v, w in edges:
+        digest.update(f"{u}\t{v}\t{w}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def threshold_subgraph(G, threshold):
+    """只保留权重大于阈值的边，并删除孤立节点（与 testgraph.py 的过滤方式一致）"""
+    edges = [(u, v) for u, v, d in G.edges(data=True) if d.get('weight', 0) > threshold]
+    H = G.edge_subgraph(edges).copy()
+    return H.subgraph([n for n in H.nodes() if H.degree(n) > 0]).copy()
+
+
+def _cache_path(cache_dir, fingerprint, threshold, resolution, random_state):
+    key = f"{fingerprint}|{threshold}|{resolution}|{random_state}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".json")
+
+
+def _load_cached(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_cached(path, result):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
+# 子进程内的边列表（由进程池 initializer 传入一次）及按阈值缓存的子图
+_WORKER_EDGES = []
+_WORKER_GRAPHS = {}
+
+
+def _init_worker(edges):
+    """进程池 initializer：每个子进程只接收一次边列表，而不是每个任务各序列化一份"""
+    global _WORKER_EDGES
+    _WORKER_EDGES = edges
+    _WORKER_GRAPHS.clear()
+
+
+def _weighted_edges(G, min_threshold):
+    """权重大于 min_threshold 的 (u, v, weight) 边列表，保持图中的边顺序"""
+    return [(u, v, float(d.get('weight', 0))) for u, v, d in G.edges(data=True)
+            if d.get('weight', 0) > min_threshold]
+
+
+def _edges_graph(edges, threshold):
+    """由边列表构建阈值子图（网格与 cached_best_partition 共用，保证同一阈值得到同一张图）"""
+    H = nx.Graph()
+    H.add_weighted_edges_from((u, v, w) for u, v, w in edges if w > threshold)
+    return H
+
+
+def _louvain_result(H, resolution, random_state):
+    """在子图上运行一次 Louvain，返回可写入缓存的结果"""
+    if H.number_of_edges() == 0:
+        return {'partition': {}, 'modularity': 0.0, 'num_communities': 0}
+    partition = community_louvain.best_partition(H, resolution=resolution, random_state=random_state)
+    return {
+        'partition': partition,
+        'modularity': community_louvain.modularity(partition, H),
+        'num_communities': len(set(partition.values())),
+    }
+
+
+def _threshold_graph(threshold):
+    """子进程内按阈值构建子图，同一阈值的多个分辨率任务共用"""
+    if threshold not in _WORKER_GRAPHS:
+        _WORKER_GRAPHS[threshold] = _edges_graph(_WORKER_EDGES, threshold)
+    return _WORKER_GRAPHS[threshold]
+
+
+def _run_louvain(task):
+    """进程池任务：在给定阈值的子图上运行一次 Louvain"""
+    threshold, resolution, random_state = task
+    return _louvain_result(_threshold_graph(threshold), resolution, random_state)
+
+
+def cached_best_partition(G, threshold=None, resolution=1.0, random_state=RANDOM_STATE, cache_dir=CACHE_DIR):
+    """
+    带缓存的 community_louvain.best_partition，缓存键为图指纹与参数
+    :param G: nx.Graph；给出 threshold 时为未过滤的原图，与 detect_communities_grid 使用同一缓存键，
+              因此网格中已算过的 (阈值, 分辨率) 分区可以直接复用，反之亦然
+    :param threshold: float, 只保留权重大于该值的边；为 None 时直接在 G 上运行
+    :return: dict, 节点 -> 社区编号
+    """
+    path = _cache_path(cache_dir, graph_fingerprint(G), threshold, resolution, random_state)
+    cached = _load_cached(path)
+    if cached is not None:
+        return cached['partition']
+    H = G if threshold is None else _edges_graph(_weighted_edges(G, threshold), threshold)
+    result = _louvain_result(H, resolution, random_state)
+    _save_cached(path, result)
+    return result['partition']
+
+
+@profiled("community_grid")
+def detect_communities_grid(G, thresholds=THRESHOLDS, resolutions=RESOLUTIONS, workers=None,
+                            cache_dir=CACHE_DIR, random_state=RANDOM_STATE):
+    """
+    在阈值 × 分辨率网格上并行运行 Louvain，已缓存的分区直接复用
+    :return: dict, (threshold, resolution) -> {'partition', 'modularity', 'num_communities', 'cached'}
+    """
+    fingerprint = graph_fingerprint(G)
+    results = {}
+    pending = []
+    for threshold in thresholds:
+        for resolution in resolutions:
+            path = _cache_path(cache_dir, fingerprint, threshold, resolution, random_state)
+            cached = _load_cached(path)
+            if cached is not None:
+                cached['cached'] = True
+                results[(threshold, resolution)] = cached
+            else:
+                pending.append((threshold, resolution, path))
+
+    if pending:
+        # 只把高于最小阈值的边传给子进程，且每个子进程只接收一次；任务按阈值排序，
+        # 使同一阈值的任务尽量落在同一子进程中复用子图
+        pending.sort(key=lambda item: item[0])
+        min_threshold = pending[0][0]
+        edges = _weighted_edges(G, min_threshold)
+        tasks = [(threshold, resolution, random_state) for threshold, resolution, _ in pending]
+        workers = min(workers or os.cpu_count() or 1, len(tasks))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(edges,)) as executor:
+            for (threshold, resolution, path), result in zip(pending, executor.map(_run_louvain, tasks)):
+                _save_cached(path, result)
+                result['cached'] = False
+                results[(threshold, resolution)] = result
+    return results
+
+
+def partition_stability(results, thresholds=THRESHOLDS, resolutions=RESOLUTIONS):
+    """
+    分区稳定性：同一阈值下相邻分辨率的分区之间的归一化互信息（NMI，只比较共同节点）
+    :return: dict, (threshold, resolution) -> 与相邻分辨率的平均 NMI
+    """
+    from sklearn.metrics import normalized_mutual_info_score
+
+    stability = {}
+    for threshold in thresholds:
+        for i, resolution in enumerate(resolutions):
+            partition = results[(threshold, resolution)]['partition']
+            scores = []
+            for j in (i - 1, i + 1):
+                if 0 <= j < len(resolutions):
+                    other = results[(threshold, resolutions[j])]['partition']
+                    common = sorted(set(partition) & set(other))
+                    if common:
+                        scores.append(normalized_mutual_info_score([partition[n] for n in common],
+                                                                   [other[n] for n in common]))
+            stability[(threshold, resolution)] = sum(scores) / len(scores) if scores else 1.0
+    return stability
+
+
+def print_grid_report(results, stability):
+    """打印网格上每组参数的社区数、模块度和稳定性"""
+    print(f"{'阈值':>6} {'分辨率':>6} {'社区数':>6} {'模块度':>8} {'稳定性':>8} {'缓存':>4}")
+    for (threshold, resolution), result in sorted(results.items()):
+        print(f"{threshold:>8} {resolution:>8} {result['num_communities']:>8} "
+              f"{result['modularity']:>10.4f} {stability[(threshold, resolution)]:>10.4f} "
+              f"{'是' if result['cached'] else '否':>4}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="多阈值、多分辨率的 Louvain 社区检测")
+    parser.add_argument("--graph", default=GRAPH_PATH)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=list(THRESHOLDS))
+    parser.add_argument("--resolutions", type=float, nargs="+", default=list(RESOLUTIONS))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    G = nx.read_graphml(args.graph)
+    print(f"原始图: 节点数量: {G.number_of_nodes()}, 边数量: {G.number_of_edges()}")
+    results = detect_communities_grid(G, args.thresholds, args.resolutions, args.workers, args.cache_dir)
+    stability = partition_stability(results, args.thresholds, args.resolutions)
+    print_grid_report(results, stability)
@@ -0,0 +1,165 @@
+import time
+import numpy as np
+import networkx as nx
+
+from profiling import profiled
+
+GRAPH_PATH = "nasdaq_lowprice_network.graphml"
+
+
+def community_array(nodes, communities):
+    """
+    一次性构建 节点下标 -> 社区编号 的数组
+    :param nodes: list, 节点顺序
+    :param communities: list[set]（greedy_modularity_communities 的输出）或 dict 节点 -> 社区编号（Louvain 的输出）
+    :return: (membership, num_communities)，未分配社区的节点记为 -1
+    """
+    index = {node: i for i, node in enumerate(nodes)}
+    membership = np.full(len(nodes), -1, dtype=np.int64)
+    if isinstance(communities, dict):
+        labels = {label: c for c, label in enumerate(sorted(set(communities.values())))}
+        for node, label in communities.items():
+            if node in index:
+                membership[index[node]] = labels[label]
+        return membership, len(labels)
+
+    for c, community in enumerate(communities):
+        for node in community:
+            if node in index:
+                membership[index[node]] = c
+    return membership, len(communities)
+
+
+def edge_arrays(G, nodes, weight=None):
+    """
+    将边列表转换为 (源下标, 目标下标, 权重) 数组
+    :param weight: str, 边权重属性名；为 None 时每条边权重为 1
+    """
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = list(G.edges(data=weight, default=1.0)) if weight else [(u, v, 1.0) for u, v in G.edges()]
+    src = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+    dst = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+    weights = np.fromiter((float(w) for _, _, w in edges), dtype=float, count=len(edges))
+    return src, dst, weights
+
+
+@profiled("community_structure")
+def community_structure(G, communities, weight=None):
+    """
+    在一次向量化的边列表遍历中计算社区结构指标
+    :return: dict，包含
+        nodes: 节点列表
+        membership: 每个节点的社区编号
+        participation: 参与系数 P_i = 1 - sum_s (k_is / k_i)^2
+        communities_reached: 每个节点的邻居覆盖的不同社区数
+        inter_community_edges: dict, (社区 a, 社区 b) -> 边数，a <= b，a == b 时为社区内边数；
+            只记录有边的社区对（孤立节点各自成一个社区时社区数可达数万，不能用稠密矩阵）
+    """
+    nodes = list(G.nodes())
+    n = len(nodes)
+    membership, num_communities = community_array(nodes, communities)
+    src, dst, weights = edge_arrays(G, nodes, weight)
+
+    # 每条无向边从两个方向各计一次：节点 -> 邻居所在社区
+    heads = np.concatenate([src, dst])
+    tails = np.concatenate([dst, src])
+    both_weights = np.concatenate([weights, weights])
+    neighbor_comm = membership[tails]
+    assigned = neighbor_comm >= 0
+    heads, neighbor_comm, both_weights = heads[assigned], neighbor_comm[assigned], both_weights[assigned]
+
+    # k_is：节点 i 连向社区 s 的（加权）边数，用 节点 * 社区数 + 社区 作为组合键
+    width = max(num_communities, 1)
+    keys = heads * width + neighbor_comm
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    k_is = np.bincount(inverse, weights=both_weights)
+    key_nodes = unique_keys // width
+
+    degree = np.bincount(key_nodes, weights=k_is, minlength=n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share_sq = np.bincount(key_nodes, weights=k_is ** 2, minlength=n) / degree ** 2
+    participation = np.where(degree > 0, 1 - share_sq, 0.0)
+    communities_reached = np.bincount(key_nodes, minlength=n)
+
+    # 社区间边数：每条边只计一次，社区对按 (较小编号, 较大编号) 组合成键后稀疏计数
+    cu, cv = membership[src], membership[dst]
+    both_assigned = (cu >= 0) & (cv >= 0)
+    cu, cv = cu[both_assigned], cv[both_assigned]
+    pair_keys, pair_counts = np.unique(np.minimum(cu, cv) * width + np.maximum(cu, cv), return_counts=True)
+    inter = dict(zip(zip((pair_keys // width).tolist(), (pair_keys % width).tolist()), pair_counts.tolist()))
+
+    return {
+        'nodes': nodes,
+        'membership': membership,
+        'participation': participation,
+        'communities_reached': communities_reached,
+        'inter_community_edges': inter,
+    }
+
+
+def rank_bridge_nodes(structure, top_n=5):
+    """
+    按连接的社区数排序的桥接节点，连接数相同时保持节点顺序（与 Network.ipynb 中的稳定排序一致）
+    :return: list[(node, communities_reached, participation)]
+    """
+    reached = structure['communities_reached']
+    participation = structure['participation']
+    candidates = np.nonzero(reached > 1)[0]
+    order = np.argsort(-reached[candidates], kind='stable')[:top_n]
+    return [(structure['nodes'][i], int(reached[i]), float(participation[i])) for i in candidates[order]]
+
+
+def naive_bridge_nodes(G, communities):
+    """Network.ipynb 中的原始实现，仅用于对照和计时"""
+    bridge_nodes = []
+    for node in G.nodes():
+        communities_connected = set()
+        for neighbor in G.neighbors(node):
+            for i, community in enumerate(communities):
+                if neighbor in community:
+                    communities_connected.add(i)
+                    break
+        if len(communities_connected) > 1:
+            bridge_nodes.append((node, len(communities_connected)))
+    return bridge_nodes
+
+
+if __name__ == "__main__":
+    import argparse
+    from community_detection import cached_best_partition, threshold_subgraph
+
+    parser = argparse.ArgumentParser(description="社区结构与桥接节点分析")
+    parser.add_argument("--graph", default=GRAPH_PATH)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--compare", action="store_true", help="与 notebook 中的逐节点实现对照计时")
+    args = parser.parse_args()
+
+    source = nx.read_graphml(args.graph)
+    G = threshold_subgraph(source, args.threshold)
+    partition = cached_best_partition(source, args.threshold)
+    communities = [set() for _ in range(max(partition.values()) + 1)] if partition else []
+    for node, c in partition.items():
+        communities[c].add(node)
+    print(f"检测到 {len(communities)} 个社区")
+
+    start = time.perf_counter()
+    structure = community_structure(G, communities)
+    elapsed = time.perf_counter() - start
+    print(f"向量化分析耗时: {elapsed:.4f} 秒")
+
+    print("\n关键桥接节点 (连接多个社区):")
+    for node, reached, participation in rank_bridge_nodes(structure, args.top):
+        print(f"{node}: 连接 {reached} 个社区, 参与系数 {participation:.3f} ({G.nodes[node].get('source')})")
+
+    if args.compare:
+        start = time.perf_counter()
+        naive = dict(naive_bridge_nodes(G, communities))
+        naive_elapsed = time.perf_counter() - start
+        reached = dict(zip(structure['nodes'], structure['communities_reached'].tolist()))
+        consistent = all(reached[node] == count for node, count in naive.items()) and \
+            len(naive) == sum(1 for count in reached.values() if count > 1)
+        naive_top = [node for node, _ in sorted(naive.items(), key=lambda x: x[1], reverse=True)[:args.top]]
+        consistent = consistent and naive_top == [node for node, _, _ in rank_bridge_nodes(structure, args.top)]
+        print(f"\n逐节点实现耗时: {naive_elapsed:.4f} 秒, 加速 {naive_elapsed / max(elapsed, 1e-9):.1f} 倍, "
+              f"结果{'一致' if consistent else '不一致'}")
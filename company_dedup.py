@@ -0,0 +1,133 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+# 代表行优先选择的证券类型：普通股优先，其次是存托凭证
+TYPE_PRIORITY = {'CS': 0, 'ADRC': 1}
+
+
+def normalize_description(text):
+    """
+    描述文本归一化：转小写并合并空白字符
+    bert-base-uncased、TF-IDF 和字符 n-gram 后端对这两种差异都不敏感，归一化前后的相似度完全一致
+    """
+    return ' '.join(str(text).lower().split())
+
+
+def normalized_description_hash(text):
+    """归一化描述的稳定哈希，用于识别重复描述"""
+    return hashlib.sha1(normalize_description(text).encode('utf-8')).hexdigest()
+
+
+def unique_descriptions(descriptions):
+    """
+    对描述去重，每种归一化描述只保留第一次出现的原文
+    :return: (unique, inverse)，unique 为去重后的描述列表，descriptions[i] 对应 unique[inverse[i]]
+    """
+    descriptions = list(descriptions)
+    codes, _ = pd.factorize(pd.Series([normalized_description_hash(text) for text in descriptions], dtype=object))
+    _, first = np.unique(codes, return_index=True)
+    unique = [descriptions[i] for i in first]
+    return unique, codes.astype(np.int64)
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def issuer_groups(df):
+    """
+    将同一发行人的不同证券（普通股、认股权证、单位、权利、不同股份类别）归为一组
+    同一组的判定：CIK 相同，或 composite FIGI 相同，或归一化描述相同
+    描述相同但 CIK 不同（且都不为空）的行不会因描述被合并，避免把共用模板描述的基金归到一起
+    :return: np.ndarray, 每行的组编号（0 开始连续编号）
+    """
+    n = len(df)
+    parent = list(range(n))
+
+    def union_rows(rows):
+        root = _find(parent, rows[0])
+        for i in rows[1:]:
+            parent[_find(parent, i)] = root
+
+    cik = df['cik'] if 'cik' in df else pd.Series([np.nan] * n, index=df.index)
+    figi = df['composite_figi'] if 'composite_figi' in df else pd.Series([np.nan] * n, index=df.index)
+    for column in (cik, figi):
+        codes, _ = pd.factorize(column)
+        for rows in pd.Series(np.arange(n)).groupby(codes).groups.values():
+            if codes[rows[0]] >= 0 and len(rows) > 1:
+                union_rows(list(rows))
+
+    desc_hash = [normalized_description_hash(text) for text in df['description']]
+    cik_values = cik.to_numpy()
+    for rows in pd.Series(np.arange(n)).groupby(desc_hash).groups.values():
+        if len(rows) > 1 and pd.Series(cik_values[list(rows)]).nunique() <= 1:
+            union_rows(list(rows))
+
+    roots = [_find(parent, i) for i in range(n)]
+    return pd.factorize(pd.Series(roots))[0]
+
+
+def collapse_share_classes(df):
+    """
+    将同一发行人的多只证券折叠为一个发行人节点
+    代表行按 普通股优先 → 市值最大 → 代码最短 → 字母序 选取，节点名沿用代表行的 ticker；
+    市值取组内最大值（保证全局最大市值不变），SIC 缺失时用组内其他成员补齐
+    :return: DataFrame，行数为发行人数量，新增 member_tickers 列（逗号分隔的全部成员代码）
+    """
+    if not len(df):
+        return df.assign(member_tickers=pd.Series(dtype=object))
+    df = df.reset_index(drop=True)
+    groups = issuer_groups(df)
+    type_rank = df['type'].map(TYPE_PRIORITY).fillna(len(TYPE_PRIORITY)) if 'type' in df else 0
+    order = (df.assign(_group=groups, _type_rank=type_rank, _cap=df['market_cap'].fillna(-1),
+                       _len=df['ticker'].astype(str).str.len())
+             .sort_values(['_group', '_type_rank', '_cap', '_len', 'ticker'],
+                          ascending=[True, True, False, True, True]))
+    grouped = order.groupby('_group', sort=True)
+
+    collapsed = grouped.head(1).set_index('_group').sort_index()
+    collapsed['member_tickers'] = grouped['ticker'].agg(lambda tickers: ','.join(map(str, tickers)))
+    collapsed['market_cap'] = grouped['market_cap'].max()
+    collapsed['sic_code'] = collapsed['sic_code'].fillna(grouped['sic_code'].first())
+    return collapsed.drop(columns=['_type_rank', '_cap', '_len']).reset_index(drop=True)
+
+
+def dedup_report(df):
+    """去重前后的规模对比"""
+    unique, _ = unique_descriptions(df['description'])
+    return {
+        'rows': len(df),
+        'unique_descriptions': len(unique),
+        'issuers': int(issuer_groups(df).max() + 1) if len(df) else 0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from network_builder import NASDAQ_PATH, LOW_PRICE_PATH, load_companies
+
+    parser = argparse.ArgumentParser(description="统计重复描述与同一发行人的多类证券")
+    parser.add_argument("--nasdaq", default=NASDAQ_PATH)
+    parser.add_argument("--low-price", default=LOW_PRICE_PATH)
+    parser.add_argument("--examples", type=int, default=10)
+    args = parser.parse_args()
+
+    nasdaq_df = load_companies(args.nasdaq, 'nasdaq100')
+    low_df = load_companies(args.low_price, 'lowprice')
+    for label, df in (('纳斯达克100', nasdaq_df), ('低价股', low_df)):
+        report = dedup_report(df)
+        print(f"{label}: {report['rows']} 行, {report['unique_descriptions']} 种不同描述, "
+              f"{report['issuers']} 个发行人")
+    pairs = len(nasdaq_df) * len(low_df)
+    collapsed_pairs = len(collapse_share_classes(nasdaq_df)) * len(collapse_share_classes(low_df))
+    print(f"跨来源股票对: {pairs} → 折叠后 {collapsed_pairs} ({collapsed_pairs / max(pairs, 1):.1%})")
+
+    collapsed = collapse_share_classes(low_df)
+    multi = collapsed[collapsed['member_tickers'].str.contains(',')]
+    print(f"\n多类证券的发行人示例（共 {len(multi)} 个）:")
+    for row in multi.head(args.examples).itertuples(index=False):
+        print(f"{row.ticker:<8} ← {row.member_tickers}")
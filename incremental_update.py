@@ -0,0 +1,165 @@
+import argparse
+import os
+import numpy as np
+import networkx as nx
+
+from profiling import profile_stage
+
+from network_builder import (
+    NASDAQ_PATH, GRAPH_PATH, EMBEDDING_CACHE_PATH, CALIBRATION_PATH, THRESHOLD, W_TEXT, W_SIC, W_MARKET,
+    load_companies, embed_companies, market_cap_scale, combine_similarity, add_company_nodes, add_pair_edges,
+    build_network,
+)
+
+# IDF 在全体描述上拟合，新增股票会改变所有已有边的文本相似度，无法增量更新
+FULL_REBUILD_BACKENDS = ('tfidf',)
+
+
+def diff_snapshot(G, snapshot_df):
+    """
+    比较新快照与当前图中的低价股节点
+    :param G: nx.Graph, 上一次生成的网络
+    :param snapshot_df: DataFrame, 新的低价股快照
+    :return: (added, removed)，两个 ticker 集合
+    """
+    current = {n for n, d in G.nodes(data=True) if d.get('source') == 'lowprice'}
+    latest = set(snapshot_df['ticker'])
+    return latest - current, current - latest
+
+
+def stored_market_cap_scale(G):
+    """读取建图时的最大市值；旧版 GraphML 没有记录时根据节点属性推算"""
+    if 'max_market_cap' in G.graph:
+        return float(G.graph['max_market_cap'])
+    max_cap = max((float(d.get('market_cap', 0)) for _, d in G.nodes(data=True)), default=0)
+    return max_cap if max_cap > 0 else 1
+
+
+def stored_build_settings(G):
+    """读取建图时记录的文本后端、精度、校准文件、权重和历史数据，增量部分必须与原网络使用同样的设置"""
+    weights = tuple(float(w) for w in G.graph['weights'].split(',')) if 'weights' in G.graph else None
+    history_paths = G.graph['history_paths'].split(os.pathsep) if G.graph.get('history_paths') else None
+    if weights is not None and len(weights) > 3 and not history_paths:
+        raise ValueError("该网络使用了收益率相关性，但没有记录历史数据文件，无法增量更新，请用 --history 重新建图")
+    return {
+        'text_backend': G.graph.get('text_backend', 'bert'),
+        'precision': G.graph.get('precision', 'float64'),
+        'calibration_path': G.graph.get('text_calibration', CALIBRATION_PATH),
+        'weights': weights,
+        'history_paths': history_paths,
+    }
+
+
+def added_edges(nasdaq_df, added_df, settings, max_cap, threshold, cache_path=EMBEDDING_CACHE_PATH):
+    """
+    按原网络的后端、精度和权重计算新增股票与纳斯达克100一侧的综合相似度
+    :return: (rows, cols, scores)，综合相似度超过阈值的股票对
+    """
+    weights = settings['weights'] or (W_TEXT, W_SIC, W_MARKET)
+    sim_return = None
+    if settings['history_paths']:
+        from return_correlation import load_history, return_similarity
+
+        with profile_stage("return_correlation"):
+            sim_return = return_similarity(nasdaq_df, added_df, load_history(settings['history_paths']))
+
+    if settings['precision'] != 'float64':
+        from reduced_precision import reduced_precision_edges
+
+        with profile_stage("embedding"):
+            nasdaq_emb, added_emb = embed_companies(nasdaq_df, added_df, cache_path)
+        with profile_stage("similarity_matrix"):
+            return reduced_precision_edges(nasdaq_df, added_df, nasdaq_emb, added_emb, max_cap,
+                                           settings['precision'], weights, threshold, sim_return)
+
+    from text_backends import compute_text_similarity
+
+    with profile_stage("text_similarity"):
+        sim_text = compute_text_similarity(nasdaq_df, added_df, settings['text_backend'], cache_path,
+                                           settings['calibration_path'])
+    with profile_stage("similarity_matrix"):
+        sim_matrix = combine_similarity(sim_text, nasdaq_df, added_df, max_cap, weights, sim_return)
+    rows, cols = np.nonzero(sim_matrix > threshold)
+    return rows, cols, sim_matrix[rows, cols]
+
+
+def update_network(snapshot_path, graph_path=GRAPH_PATH, nasdaq_path=NASDAQ_PATH,
+                   cache_path=EMBEDDING_CACHE_PATH, output_path=None, threshold=None):
+    """
+    用新的每日低价股快照增量更新网络：
+    删除离开股票池的节点（及其边），只为新增股票计算与纳斯达克100一侧的相似度
+    :param snapshot_path: str, 新的 low_price_companies_<date>.csv
+    :param output_path: str, 输出路径，默认原地覆盖 graph_path
+    :param threshold: float, 边阈值，默认沿用建图时记录的阈值；与记录的阈值不同时全量重建
+    :return: nx.Graph
+    """
+    output_path = output_path or graph_path
+    with profile_stage("load_graphml"):
+        G = nx.read_graphml(graph_path)
+    stored_threshold = float(G.graph.get('threshold', THRESHOLD))
+    if threshold is None:
+        threshold = stored_threshold
+    settings = stored_build_settings(G)
+    with profile_stage("load_csv"):
+        nasdaq_df = load_companies(nasdaq_path, 'nasdaq100')
+        snapshot_df = load_companies(snapshot_path, 'lowprice')
+    collapsed = bool(G.graph.get('collapse_share_classes', False))
+    if collapsed:
+        from company_dedup import collapse_share_classes
+
+        # 与原网络保持同样的节点粒度（发行人节点）
+        nasdaq_df, snapshot_df = collapse_share_classes(nasdaq_df), collapse_share_classes(snapshot_df)
+
+    added, removed = diff_snapshot(G, snapshot_df)
+    print(f"新增低价股: {len(added)} 只, 移除低价股: {len(removed)} 只")
+
+    # 市值归一化依赖全体公司的最大市值，若发生变化则所有边权重都会改变，只能全量重建
+    max_cap = market_cap_scale(nasdaq_df, snapshot_df)
+    rebuild_reason = None
+    if abs(max_cap - stored_market_cap_scale(G)) > 1e-6 * max_cap:
+        rebuild_reason = "最大市值发生变化"
+    elif abs(threshold - stored_threshold) > 1e-12:
+        # 已有的边是按原阈值保留的，只对新增股票使用新阈值会得到阈值混杂的网络
+        rebuild_reason = f"阈值由 {stored_threshold} 改为 {threshold}"
+    elif settings['text_backend'] in FULL_REBUILD_BACKENDS and (added or removed):
+        rebuild_reason = f"{settings['text_backend']} 后端的 IDF 依赖全体描述"
+    if rebuild_reason:
+        print(f"{rebuild_reason}，增量更新不再精确，执行全量重建...")
+        G = build_network(nasdaq_path, snapshot_path, cache_path, threshold,
+                          collapse_share_classes=collapsed, **settings)
+        nx.write_graphml(G, output_path)
+        return G
+
+    # 删除节点会同时删除其所有边
+    G.remove_nodes_from(removed)
+
+    added_df = snapshot_df[snapshot_df['ticker'].isin(added)].drop_duplicates(subset=['ticker'])
+    added_df = added_df.reset_index(drop=True)
+    if len(added_df):
+        rows, cols, scores = added_edges(nasdaq_df, added_df, settings, max_cap, threshold, cache_path)
+        with profile_stage("edge_building"):
+            add_company_nodes(G, added_df)
+            num_edges = add_pair_edges(G, nasdaq_df['ticker'].tolist(), added_df['ticker'].tolist(),
+                                       rows, cols, scores)
+        print(f"为新增股票添加了 {num_edges} 条边")
+
+    G.graph['max_market_cap'] = float(max_cap)
+    G.graph['threshold'] = float(threshold)
+    with profile_stage("write_graphml"):
+        nx.write_graphml(G, output_path)
+    print(f"更新后的网络: 节点数量 = {G.number_of_nodes()}, 边的数量 = {G.number_of_edges()}")
+    print(f"网络已保存到 {output_path}")
+    return G
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="使用新的低价股快照增量更新网络")
+    parser.add_argument("snapshot", help="新的 low_price_companies_<date>.csv 文件")
+    parser.add_argument("--graph", default=GRAPH_PATH, help="上一次生成的 GraphML 文件")
+    parser.add_argument("--nasdaq", default=NASDAQ_PATH, help="纳斯达克100/标普100 合并公司信息")
+    parser.add_argument("--cache", default=EMBEDDING_CACHE_PATH, help="嵌入缓存文件")
+    parser.add_argument("--output", default=None, help="输出路径（默认原地覆盖）")
+    parser.add_argument("--threshold", type=float, default=None, help="边阈值（默认沿用建图时的阈值，不同时全量重建）")
+    args = parser.parse_args()
+
+    update_network(args.snapshot, args.graph, args.nasdaq, args.cache, args.output, args.threshold)
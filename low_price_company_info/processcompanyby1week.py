@@ -1,12 +1,15 @@
 import os
+import sys
 import glob
 import pandas as pd
 
-# 定义存放CSV文件的文件夹路径
-folder_path = "company_info"
+# 定义存放CSV文件的文件夹路径：access2lowpricecompany.py 把每日快照写在当前目录，也可通过命令行参数指定
+folder_path = sys.argv[1] if len(sys.argv) > 1 else "."
 
-# 获取该文件夹下所有CSV文件的路径
-csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
+# 获取该文件夹下所有每日快照的路径（按日期排序）
+csv_files = sorted(glob.glob(os.path.join(folder_path, "low_price_companies_*.csv")))
+if not csv_files:
+    sys.exit(f"错误：{os.path.abspath(folder_path)} 下没有 low_price_companies_*.csv 每日快照，请先运行 fetch-lowprice")
 print(f"读取到的CSV文件: {csv_files}")
 
 # 读取所有CSV文件并存入列表中
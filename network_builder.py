@@ -0,0 +1,349 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+from profiling import profile_stage
+
+# 默认输入输出路径
+NASDAQ_PATH = "union_NDX_and_SP100/merged_indices_2025-03-10.csv"
+LOW_PRICE_PATH = "low_price_company_info/final_union_by_ticker.csv"
+GRAPH_PATH = "nasdaq_lowprice_network.graphml"
+EMBEDDING_CACHE_PATH = "embedding_cache.npz"
+# 稀疏文本后端到 BERT 相似度尺度的校准映射（见 text_backends.calibrate_backend）
+CALIBRATION_PATH = "text_calibration.npz"
+
+# 权重设置：文本权重、SIC权重、市值权重（与 Network.ipynb 保持一致）
+W_TEXT = 0.7
+W_SIC = 0.2
+W_MARKET = 0.1
+
+# 启用收益率相关性（第四项）时的默认权重：(文本, SIC, 市值, 收益率)
+RETURN_WEIGHTS = (0.6, 0.2, 0.1, 0.1)
+
+# 边阈值：综合相似度大于该值才加边
+THRESHOLD = 0.6
+
+MODEL_NAME = "bert-base-uncased"
+EMBEDDING_DIM = 768  # BERT base dimension
+
+
+def load_companies(path, source):
+    """
+    读取公司信息 CSV，只保留建图需要的字段
+    :param path: str, CSV 文件路径
+    :param source: str, 数据来源标记（'nasdaq100' 或 'lowprice'）
+    :return: DataFrame，包含 ticker, description, sic_code, market_cap, source，
+             以及用于识别同一发行人的 cik, composite_figi, type（源文件缺少时为空）
+    """
+    df = pd.read_csv(path)
+    df = df.reindex(columns=['ticker', 'description', 'sic_code', 'market_cap', 'cik', 'composite_figi', 'type'])
+    df = df.dropna(subset=['description'])
+    # 确保 ticker 列不包含 None 值
+    df = df.dropna(subset=['ticker'])
+    df['source'] = source
+    df['sic_code'] = pd.to_numeric(df['sic_code'], errors='coerce')
+    df['market_cap'] = pd.to_numeric(df['market_cap'], errors='coerce')
+    return df.reset_index(drop=True)
+
+
+def load_bert_model(model_name=MODEL_NAME):
+    """
+    加载预训练模型和 Tokenizer（延迟导入 torch / transformers）
+    :return: (tokenizer, model, device)
+    """
+    import torch
+    from transformers import AutoTokenizer, AutoModel
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()  # 设置为评估模式
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model.to(device)
+    return tokenizer, model, device
+
+
+def get_sentence_embedding(text, tokenizer, model, device):
+    """
+    利用BERT模型对输入文本进行编码，并采用平均池化得到句子向量
+    """
+    import torch
+
+    # 确保输入文本是字符串类型
+    if not isinstance(text, str):
+        text = str(text)
+
+    inputs = tokenizer(text, return_tensors='pt', truncation=True, max_length=128, padding=True)
+    inputs = {key: value.to(device) for key, value in inputs.items()}
+    with torch.no_grad():
+        outputs = model(**inputs)
+    embeddings = outputs.last_hidden_state
+    attention_mask = inputs['attention_mask']
+    # 计算每个token的权重后取平均池化
+    mask = attention_mask.unsqueeze(-1).expand(embeddings.size()).float()
+    summed = torch.sum(embeddings * mask, dim=1)
+    counts = torch.clamp(mask.sum(dim=1), min=1e-9)
+    mean_pooled = summed / counts
+    return mean_pooled.squeeze().cpu().numpy()
+
+
+def description_hash(text):
+    """描述文本的稳定哈希，用作嵌入缓存的键"""
+    return hashlib.sha1(str(text).encode('utf-8')).hexdigest()
+
+
+def load_embedding_cache(path=EMBEDDING_CACHE_PATH):
+    """
+    读取嵌入缓存
+    :return: dict, 描述哈希 -> 嵌入向量
+    """
+    if not os.path.exists(path):
+        return {}
+    data = np.load(path)
+    return dict(zip(data['keys'].tolist(), data['embeddings']))
+
+
+def save_embedding_cache(cache, path=EMBEDDING_CACHE_PATH):
+    """将嵌入缓存保存为 npz 文件"""
+    if not cache:
+        return
+    keys = list(cache.keys())
+    embeddings = np.vstack([cache[k] for k in keys])
+    np.savez(path, keys=np.array(keys), embeddings=embeddings)
+
+
+def embed_descriptions(descriptions, cache=None, model_bundle=None):
+    """
+    对描述列表生成嵌入，命中缓存的描述不再重新编码
+    :param descriptions: list[str], 描述文本
+    :param cache: dict, 描述哈希 -> 嵌入向量，新生成的嵌入会写回该字典
+    :param model_bundle: (tokenizer, model, device)，为 None 时按需加载
+    :return: np.ndarray, 形状 (n, EMBEDDING_DIM)
+    """
+    if cache is None:
+        cache = {}
+    keys = [description_hash(text) for text in descriptions]
+    # 同一描述（如认股权证与普通股共用的描述）只编码一次
+    missing = list({key: text for key, text in zip(keys, descriptions) if key not in cache}.items())
+
+    if missing:
+        from tqdm import tqdm
+
+        if model_bundle is None:
+            model_bundle = load_bert_model()
+        tokenizer, model, device = model_bundle
+        for key, text in tqdm(missing, desc="Embedding descriptions"):
+            try:
+                cache[key] = get_sentence_embedding(text, tokenizer, model, device)
+            except Exception as e:
+                print(f"Error embedding text: {str(text)[:50]}... - {str(e)}")
+                # 使用零向量替代出错的情况
+                cache[key] = np.zeros(EMBEDDING_DIM)
+
+    if not keys:
+        return np.zeros((0, EMBEDDING_DIM))
+    return np.vstack([cache[key] for key in keys])
+
+
+def normalize_rows(matrix):
+    """按行做 L2 归一化，零向量保持为零（与 cosine_similarity 的行为一致）"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def market_cap_scale(*dfs):
+    """市值归一化使用的最大市值（与 notebook 一致，缺失值按 0 处理）"""
+    max_cap = max(df['market_cap'].fillna(0).max() if len(df) else 0 for df in dfs)
+    return max_cap if max_cap > 0 else 1
+
+
+def compute_cross_similarity(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap,
+                             weights=(W_TEXT, W_SIC, W_MARKET)):
+    """
+    计算纳斯达克100与低价股之间的综合相似度矩阵（向量化实现）
+    :param weights: (文本权重, SIC权重, 市值权重)
+    :return: np.ndarray, 形状 (len(nasdaq_df), len(low_df))
+    """
+    # 1. 文本相似度：归一化后的嵌入做矩阵乘法
+    sim_text = normalize_rows(nasdaq_emb) @ normalize_rows(low_emb).T
+    return combine_similarity(sim_text, nasdaq_df, low_df, max_cap, weights)
+
+
+def combine_similarity(sim_text, nasdaq_df, low_df, max_cap, weights=(W_TEXT, W_SIC, W_MARKET),
+                       sim_return=None):
+    """
+    将文本相似度矩阵与 SIC、市值相似度加权合成综合相似度
+    :param sim_text: np.ndarray, 形状 (len(nasdaq_df), len(low_df)) 的文本相似度
+    :param weights: (文本, SIC, 市值) 或 (文本, SIC, 市值, 收益率) 权重
+    :param sim_return: np.ndarray, 可选的收益率相关性相似度，需要 weights 含第四项
+    :return: np.ndarray, 综合相似度矩阵
+    """
+    # 2. SIC 相似度：相同为1，否则为0，缺失值视为不同
+    sic_a = nasdaq_df['sic_code'].to_numpy(dtype=float)
+    sic_b = low_df['sic_code'].to_numpy(dtype=float)
+    sim_sic = (sic_a[:, None] == sic_b[None, :]).astype(float)
+
+    # 3. 市值相似度：差值越小，相似度越高
+    cap_a = nasdaq_df['market_cap'].fillna(0).to_numpy(dtype=float) / max_cap
+    cap_b = low_df['market_cap'].fillna(0).to_numpy(dtype=float) / max_cap
+    sim_market = 1 - np.abs(cap_a[:, None] - cap_b[None, :])
+
+    w_text, w_sic, w_market = weights[:3]
+    combined = w_text * sim_text + w_sic * sim_sic + w_market * sim_market
+
+    # 4. 收益率相关性（可选）
+    if sim_return is not None:
+        if len(weights) < 4:
+            raise ValueError("启用收益率相关性时 weights 需要包含第四项权重")
+        combined = combined + weights[3] * sim_return
+    return combined
+
+
+def add_company_nodes(G, df):
+    """添加节点及属性，确保属性值不为 None；折叠后的发行人节点额外记录 member_tickers"""
+    has_members = 'member_tickers' in df
+    for row in df.itertuples(index=False):
+        G.add_node(row.ticker,
+                   description=str(row.description),
+                   sic_code=row.sic_code if not pd.isna(row.sic_code) else -1,
+                   market_cap=row.market_cap if not pd.isna(row.market_cap) else 0,
+                   source=row.source)
+        if has_members:
+            G.nodes[row.ticker]['member_tickers'] = row.member_tickers
+
+
+def add_similarity_edges(G, nasdaq_tickers, low_tickers, sim_matrix, threshold=THRESHOLD):
+    """
+    根据综合相似度矩阵添加边
+    :return: int, 新增边的数量
+    """
+    rows, cols = np.nonzero(sim_matrix > threshold)
+    return add_pair_edges(G, nasdaq_tickers, low_tickers, rows, cols, sim_matrix[rows, cols])
+
+
+def add_pair_edges(G, nasdaq_tickers, low_tickers, rows, cols, scores):
+    """
+    根据 (行, 列, 相似度) 三元组添加边
+    :return: int, 新增边的数量
+    """
+    for i, j, score in zip(rows, cols, scores):
+        G.add_edge(nasdaq_tickers[i], low_tickers[j], weight=round(float(score), 3))
+    return len(rows)
+
+
+def embed_companies(nasdaq_df, low_df, cache_path=EMBEDDING_CACHE_PATH):
+    """
+    读取缓存并生成两侧公司的描述嵌入，新嵌入写回缓存文件
+    :return: (nasdaq_emb, low_emb)
+    """
+    cache = load_embedding_cache(cache_path)
+    nasdaq_emb = embed_descriptions(nasdaq_df['description'].tolist(), cache)
+    low_emb = embed_descriptions(low_df['description'].tolist(), cache)
+    save_embedding_cache(cache, cache_path)
+    return nasdaq_emb, low_emb
+
+
+def build_network(nasdaq_path=NASDAQ_PATH, low_price_path=LOW_PRICE_PATH,
+                  cache_path=EMBEDDING_CACHE_PATH, threshold=THRESHOLD, use_pruning=False,
+                  text_backend='bert', precision='float64', history_paths=None, weights=None,
+                  collapse_share_classes=False, calibration_path=CALIBRATION_PATH):
+    """
+    完整构建纳斯达克100与低价股之间的关系网络
+    :param use_pruning: bool, 是否先用上界剪枝生成候选对（结果与全量计算一致，仅支持 bert 后端）
+    :param text_backend: str, 文本相似度后端，见 text_backends.TEXT_BACKENDS
+    :param precision: str, bert 嵌入相似度的计算精度（'float64' / 'float32' / 'float16' / 'int8'）
+    :param history_paths: list[str], 历史数据 CSV；提供时加入收益率相关性作为第四项
+    :param weights: 相似度权重，默认 (W_TEXT, W_SIC, W_MARKET)，启用收益率时默认 RETURN_WEIGHTS
+    :param collapse_share_classes: bool, 将同一发行人的普通股、认股权证、单位等折叠为一个节点（见 company_dedup）
+    :param calibration_path: str, 非 BERT 后端的校准文件，相似度先映射到 BERT 尺度再套用权重和阈值
+    :return: nx.Graph
+    """
+    if (use_pruning or precision != 'float64') and text_backend != 'bert':
+        raise ValueError("候选剪枝和低精度计算依赖稠密嵌入，仅支持 bert 后端")
+    if use_pruning and precision != 'float64':
+        raise ValueError("候选剪枝只在 float64 精度下保证与全量计算一致")
+
+    with profile_stage("load_csv"):
+        nasdaq_df = load_companies(nasdaq_path, 'nasdaq100')
+        low_df = load_companies(low_price_path, 'lowprice')
+    if collapse_share_classes:
+        from company_dedup import collapse_share_classes as collapse
+
+        # 在进入二次复杂度的阶段之前缩小 n
+        with profile_stage("collapse_share_classes"):
+            nasdaq_df, low_df = collapse(nasdaq_df), collapse(low_df)
+    max_cap = market_cap_scale(nasdaq_df, low_df)
+
+    sim_return = None
+    if history_paths:
+        from return_correlation import load_history, return_similarity
+
+        with profile_stage("return_correlation"):
+            sim_return = return_similarity(nasdaq_df, low_df, load_history(history_paths))
+    if weights is None:
+        weights = RETURN_WEIGHTS if sim_return is not None else (W_TEXT, W_SIC, W_MARKET)
+
+    G = nx.Graph()
+    # 记录建图参数，供增量更新时校验
+    G.graph['max_market_cap'] = float(max_cap)
+    G.graph['threshold'] = float(threshold)
+    G.graph['text_backend'] = text_backend
+    G.graph['precision'] = precision
+    G.graph['weights'] = ','.join(str(w) for w in weights)
+    G.graph['collapse_share_classes'] = bool(collapse_share_classes)
+    if history_paths:
+        # 增量更新时用同样的历史数据为新增股票计算收益率相关性
+        G.graph['history_paths'] = os.pathsep.join(history_paths)
+    with profile_stage("add_nodes"):
+        add_company_nodes(G, nasdaq_df)
+        add_company_nodes(G, low_df)
+    nasdaq_tickers = nasdaq_df['ticker'].tolist()
+    low_tickers = low_df['ticker'].tolist()
+    if use_pruning:
+        from candidate_pruning import generate_candidates
+
+        with profile_stage("embedding"):
+            nasdaq_emb, low_emb = embed_companies(nasdaq_df, low_df, cache_path)
+        with profile_stage("similarity_matrix"):
+            rows, cols, scores, _ = generate_candidates(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap,
+                                                        weights, threshold, sim_return=sim_return)
+        with profile_stage("edge_building"):
+            add_pair_edges(G, nasdaq_tickers, low_tickers, rows, cols, scores)
+        return G
+
+    if precision != 'float64':
+        from reduced_precision import reduced_precision_edges
+
+        with profile_stage("embedding"):
+            nasdaq_emb, low_emb = embed_companies(nasdaq_df, low_df, cache_path)
+        # 逐块合成与取边，不生成完整的 float64 矩阵
+        with profile_stage("similarity_matrix"):
+            rows, cols, scores = reduced_precision_edges(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap, precision,
+                                                         weights, threshold, sim_return)
+        with profile_stage("edge_building"):
+            add_pair_edges(G, nasdaq_tickers, low_tickers, rows, cols, scores)
+        return G
+
+    from text_backends import compute_text_similarity
+
+    # bert 后端的嵌入生成也在此阶段内
+    with profile_stage("text_similarity"):
+        sim_text = compute_text_similarity(nasdaq_df, low_df, text_backend, cache_path, calibration_path)
+    if text_backend != 'bert':
+        # 增量更新时沿用同一份校准
+        G.graph['text_calibration'] = calibration_path
+    with profile_stage("similarity_matrix"):
+        sim_matrix = combine_similarity(sim_text, nasdaq_df, low_df, max_cap, weights, sim_return)
+    with profile_stage("edge_building"):
+        add_similarity_edges(G, nasdaq_tickers, low_tickers, sim_matrix, threshold)
+    return G
+
+
+if __name__ == "__main__":
+    G = build_network()
+    print(f"图网络信息: 节点数量 = {G.number_of_nodes()}, 边的数量 = {G.number_of_edges()}")
+    with profile_stage("write_graphml"):
+        nx.write_graphml(G, GRAPH_PATH)
+    print(f"网络已保存到 {GRAPH_PATH}")
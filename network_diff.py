@@ -0,0 +1,242 @@
+"""
+逐日网络差异：每天的边集合存为排序后的 int64 边键数组 + float32 权重数组
+
+    边键 = (较小节点编号 << 32) | 较大节点编号
+
+节点编号来自只追加、不重排的 ticker -> 编号 字典（ticker_ids.json），同一只股票在所有日期的编号相同，
+因此两天之间的新增、删除、权重变化的边和节点变动都可以用排序数组的集合运算一次算出，不需要加载 networkx 图。
+"""
+import json
+import os
+import xml.etree.ElementTree as ET
+import numpy as np
+
+SNAPSHOT_DIR = "network_snapshots"
+ID_MAP_PATH = os.path.join(SNAPSHOT_DIR, "ticker_ids.json")
+
+# 边权重保留 3 位小数，变化超过半个最小单位才算权重变化
+REWEIGHT_TOLERANCE = 5e-4
+
+
+def load_ticker_ids(path=ID_MAP_PATH):
+    """
+    读取 ticker -> 编号 字典
+    :return: dict；文件不存在时返回空字典
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        tickers = json.load(f)['tickers']
+    return {ticker: i for i, ticker in enumerate(tickers)}
+
+
+def save_ticker_ids(ids, path=ID_MAP_PATH):
+    """按编号顺序写出 ticker 列表（先写临时文件再替换，避免中断时损坏字典）"""
+    tickers = sorted(ids, key=ids.get)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'tickers': tickers}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def assign_ids(ids, tickers):
+    """
+    查询 ticker 的编号，新 ticker 追加到字典末尾
+    :return: np.ndarray[int64]
+    """
+    result = np.empty(len(tickers), dtype=np.int64)
+    for i, ticker in enumerate(tickers):
+        if ticker not in ids:
+            ids[ticker] = len(ids)
+        result[i] = ids[ticker]
+    return result
+
+
+def edge_keys(u_ids, v_ids):
+    """无向边 -> int64 边键，较小编号放在高 32 位"""
+    u_ids, v_ids = np.asarray(u_ids, dtype=np.int64), np.asarray(v_ids, dtype=np.int64)
+    lo, hi = np.minimum(u_ids, v_ids), np.maximum(u_ids, v_ids)
+    return (lo << 32) | hi
+
+
+def split_keys(keys):
+    """边键 -> (较小编号, 较大编号)"""
+    keys = np.asarray(keys, dtype=np.int64)
+    return keys >> 32, keys & 0xFFFFFFFF
+
+
+def read_graphml_edges(path):
+    """
+    流式读取 GraphML 中的节点和带权边，不构建 networkx 图
+    :return: (nodes, sources, targets, weights)
+    """
+    weight_key = None
+    nodes, sources, targets, weights = [], [], [], []
+    pending_weight = None
+    for _, elem in ET.iterparse(path, events=('end',)):
+        tag = elem.tag.rsplit('}', 1)[-1]
+        if tag == 'key' and elem.get('for') == 'edge' and elem.get('attr.name') == 'weight':
+            weight_key = elem.get('id')
+        elif tag == 'data' and elem.get('key') == weight_key:
+            # data 元素先于所属 edge 元素结束，暂存权重
+            pending_weight = float(elem.text)
+        elif tag == 'node':
+            nodes.append(elem.get('id'))
+            elem.clear()
+        elif tag == 'edge':
+            sources.append(elem.get('source'))
+            targets.append(elem.get('target'))
+            weights.append(pending_weight if pending_weight is not None else 0.0)
+            pending_weight = None
+            elem.clear()
+    return nodes, sources, targets, np.array(weights, dtype=np.float32)
+
+
+def build_snapshot(nodes, sources, targets, weights, ids):
+    """
+    将节点与边列表编码为排序后的数组
+    :param ids: dict, ticker -> 编号，新 ticker 会被追加
+    :return: dict, keys / weights / nodes 三个排序数组
+    """
+    node_ids = np.unique(assign_ids(ids, nodes))
+    keys = edge_keys(assign_ids(ids, sources), assign_ids(ids, targets))
+    order = np.argsort(keys, kind='stable')
+    keys, weights = keys[order], np.asarray(weights, dtype=np.float32)[order]
+    # 多重边只保留第一条
+    keep = np.concatenate([[True], keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=bool)
+    return {'keys': keys[keep], 'weights': weights[keep], 'nodes': node_ids}
+
+
+def snapshot_from_graph(G, ids):
+    """从内存中的 networkx 图生成快照（构建网络后直接保存，无需再读 GraphML）"""
+    edges = list(G.edges(data='weight', default=0.0))
+    return build_snapshot([str(node) for node in G.nodes()], [str(u) for u, _, _ in edges],
+                          [str(v) for _, v, _ in edges], [float(w) for _, _, w in edges], ids)
+
+
+def snapshot_path(date, snapshot_dir=SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, f"edges_{date}.npz")
+
+
+def diff_path(old_date, new_date, snapshot_dir=SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, f"diff_{old_date}_{new_date}.npz")
+
+
+def save_snapshot(snapshot, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    np.savez_compressed(path, **snapshot)
+
+
+def load_snapshot(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in ('keys', 'weights', 'nodes')}
+
+
+def snapshot_graphml(graph_path, date, snapshot_dir=SNAPSHOT_DIR, id_path=ID_MAP_PATH):
+    """读取某天的 GraphML，写出该日的边快照并更新编号字典"""
+    ids = load_ticker_ids(id_path)
+    snapshot = build_snapshot(*read_graphml_edges(graph_path), ids)
+    return _record_snapshot(snapshot, ids, date, snapshot_dir, id_path), snapshot
+
+
+def snapshot_network(G, date, snapshot_dir=SNAPSHOT_DIR, id_path=ID_MAP_PATH):
+    """构建网络后直接写出该日的边快照并更新编号字典"""
+    ids = load_ticker_ids(id_path)
+    snapshot = snapshot_from_graph(G, ids)
+    return _record_snapshot(snapshot, ids, date, snapshot_dir, id_path), snapshot
+
+
+def _record_snapshot(snapshot, ids, date, snapshot_dir, id_path):
+    path = snapshot_path(date, snapshot_dir)
+    save_snapshot(snapshot, path)
+    save_ticker_ids(ids, id_path)
+    return path
+
+
+def diff_snapshots(old, new, tolerance=REWEIGHT_TOLERANCE):
+    """
+    比较两天的快照（全部为排序数组上的集合运算）
+    :return: dict, 新增 / 删除 / 权重变化的边及新增 / 删除的节点
+    """
+    common, old_idx, new_idx = np.intersect1d(old['keys'], new['keys'], assume_unique=True, return_indices=True)
+    changed = np.abs(new['weights'][new_idx] - old['weights'][old_idx]) > tolerance
+
+    added = ~np.isin(new['keys'], common, assume_unique=True)
+    removed = ~np.isin(old['keys'], common, assume_unique=True)
+    return {
+        'added_keys': new['keys'][added],
+        'added_weights': new['weights'][added],
+        'removed_keys': old['keys'][removed],
+        'removed_weights': old['weights'][removed],
+        'reweighted_keys': common[changed],
+        'reweighted_old': old['weights'][old_idx[changed]],
+        'reweighted_new': new['weights'][new_idx[changed]],
+        'nodes_added': np.setdiff1d(new['nodes'], old['nodes'], assume_unique=True),
+        'nodes_removed': np.setdiff1d(old['nodes'], new['nodes'], assume_unique=True),
+        'unchanged_edges': np.int64(len(common) - changed.sum()),
+    }
+
+
+def decode_edges(keys, tickers):
+    """边键 -> [(ticker_u, ticker_v)]"""
+    lo, hi = split_keys(keys)
+    return [(tickers[u], tickers[v]) for u, v in zip(lo.tolist(), hi.tolist())]
+
+
+def print_diff(diff, ids, top=10):
+    """打印差异摘要及变化最大的边"""
+    tickers = sorted(ids, key=ids.get)
+    print(f"边: 新增 {len(diff['added_keys'])}, 删除 {len(diff['removed_keys'])}, "
+          f"权重变化 {len(diff['reweighted_keys'])}, 未变 {int(diff['unchanged_edges'])}")
+    print(f"节点: 新增 {len(diff['nodes_added'])}, 删除 {len(diff['nodes_removed'])}")
+
+    for label, keys, weights in (('新增', diff['added_keys'], diff['added_weights']),
+                                 ('删除', diff['removed_keys'], diff['removed_weights'])):
+        order = np.argsort(-weights)[:top]
+        if len(order):
+            print(f"\n权重最高的{label}边:")
+            for (u, v), w in zip(decode_edges(keys[order], tickers), weights[order]):
+                print(f"  {u} - {v}: {w:.3f}")
+
+    delta = diff['reweighted_new'] - diff['reweighted_old']
+    order = np.argsort(-np.abs(delta))[:top]
+    if len(order):
+        print("\n权重变化最大的边:")
+        for (u, v), a, b in zip(decode_edges(diff['reweighted_keys'][order], tickers),
+                                diff['reweighted_old'][order], diff['reweighted_new'][order]):
+            print(f"  {u} - {v}: {a:.3f} → {b:.3f}")
+
+
+def diff_dates(old_date, new_date, snapshot_dir=SNAPSHOT_DIR, tolerance=REWEIGHT_TOLERANCE):
+    """比较两天的快照并写出差异文件"""
+    diff = diff_snapshots(load_snapshot(snapshot_path(old_date, snapshot_dir)),
+                          load_snapshot(snapshot_path(new_date, snapshot_dir)), tolerance)
+    path = diff_path(old_date, new_date, snapshot_dir)
+    np.savez_compressed(path, **diff)
+    return path, diff
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="逐日网络差异")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="快照与差异文件目录")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    p = subparsers.add_parser("snapshot", help="将某天的 GraphML 编码为边快照")
+    p.add_argument("graph")
+    p.add_argument("date", help="快照日期 YYYY-MM-DD")
+    p = subparsers.add_parser("diff", help="比较两天的快照")
+    p.add_argument("old_date")
+    p.add_argument("new_date")
+    p.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    id_path = os.path.join(args.dir, "ticker_ids.json")
+    if args.command == "snapshot":
+        path, snapshot = snapshot_graphml(args.graph, args.date, args.dir, id_path)
+        print(f"快照已保存到 {path}: {len(snapshot['nodes'])} 个节点, {len(snapshot['keys'])} 条边")
+    else:
+        path, diff = diff_dates(args.old_date, args.new_date, args.dir)
+        print_diff(diff, load_ticker_ids(id_path), args.top)
+        print(f"\n差异已保存到 {path}")
@@ -0,0 +1,265 @@
+"""
+可选的流水线性能分析：记录每个阶段的墙钟时间、CPU 时间、峰值 RSS 和 tracemalloc 分配热点
+
+    with profile_stage("embedding"):
+        ...
+
+    @profiled("similarity_matrix")
+    def compute(...):
+        ...
+
+默认关闭，调用 enable_profiling() 或设置环境变量 QT4MC_PROFILE=1 后生效；
+设置 QT4MC_CPROFILE=1 时每个阶段额外输出 cProfile 结果。进程退出时写出本次运行的汇总报告。
+"""
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_ENV = "QT4MC_PROFILE"
+CPROFILE_ENV = "QT4MC_CPROFILE"
+PROFILE_DIR = "profiles"
+
+# 每个阶段记录的分配热点数量
+TOP_ALLOCATIONS = 10
+
+_state = {
+    'enabled': False,
+    'cprofile': False,
+    'output_dir': PROFILE_DIR,
+    'run_id': None,
+    'stages': [],
+    'stack': [],
+    'report_written': False,
+    # 重置内核峰值 RSS 之前观测到的最大值，保证 peak_rss_mb() 仍是整个进程生命周期的峰值
+    'rss_peak_mb': 0.0,
+}
+
+# Linux 上向 clear_refs 写入 5 会重置 VmHWM（同时影响 ru_maxrss），用于测量单个阶段的峰值 RSS
+CLEAR_REFS_PATH = "/proc/self/clear_refs"
+STATUS_PATH = "/proc/self/status"
+
+
+def peak_rss_mb():
+    """
+    进程峰值常驻内存（MB），Linux 上 ru_maxrss 单位为 KB，macOS 为字节
+    resource 模块只在类 Unix 系统上可用，在此处导入，Windows 上只返回已观测到的峰值（通常为 0）
+    """
+    try:
+        import resource
+    except ImportError:
+        return _state['rss_peak_mb']
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    return max(peak, _state['rss_peak_mb'])
+
+
+def _rss_high_water_mb():
+    """自上次重置以来的峰值 RSS（MB），读取 /proc/self/status 的 VmHWM；不可用时返回 None"""
+    try:
+        with open(STATUS_PATH) as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_rss_high_water():
+    """
+    重置 VmHWM，使之后读到的峰值只反映当前阶段
+    :return: bool, 平台不支持（非 Linux 或没有权限）时返回 False
+    """
+    current = _rss_high_water_mb()
+    if current is None:
+        return False
+    _state['rss_peak_mb'] = max(_state['rss_peak_mb'], current)
+    try:
+        with open(CLEAR_REFS_PATH, 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def enable_profiling(output_dir=PROFILE_DIR, cprofile=False):
+    """打开性能分析，并在进程退出时写出汇总报告"""
+    if _state['enabled']:
+        return
+    _state.update(enabled=True, cprofile=cprofile, output_dir=output_dir,
+                  run_id=datetime.now().strftime('%Y%m%d-%H%M%S') + f"-{os.getpid()}")
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    atexit.register(write_report)
+
+
+def is_enabled():
+    return _state['enabled']
+
+
+@contextmanager
+def profile_stage(name):
+    """
+    记录一个流水线阶段的耗时与内存；未启用时几乎没有开销
+    支持嵌套：内层阶段的内存峰值会计入外层阶段
+    峰值 RSS 在 Linux 上按阶段重置后测量（stage_peak_rss_mb），其他平台只能记录进程峰值的增长
+    """
+    if not _state['enabled']:
+        yield
+        return
+
+    stack = _state['stack']
+    if stack:
+        # 保存外层阶段到目前为止的峰值，再为本阶段重新计峰值
+        stack[-1]['traced_peak'] = max(stack[-1]['traced_peak'], tracemalloc.get_traced_memory()[1])
+        stack[-1]['rss_peak'] = max(stack[-1]['rss_peak'], _rss_high_water_mb() or 0.0)
+    tracemalloc.reset_peak()
+    per_stage_rss = _reset_rss_high_water()
+    frame = {'traced_peak': 0, 'rss_peak': 0.0}
+    # 进入时就登记，保证报告按阶段开始顺序排列（外层在前）
+    record = {'name': name, 'depth': len(stack)}
+    _state['stages'].append(record)
+    stack.append(frame)
+
+    # cProfile 同一时间只能有一个生效，只对最外层阶段启用
+    profiler = cProfile.Profile() if _state['cprofile'] and len(stack) == 1 else None
+    snapshot_before = tracemalloc.take_snapshot()
+    rss_before = peak_rss_mb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        traced_peak = max(frame['traced_peak'], tracemalloc.get_traced_memory()[1])
+        stats = tracemalloc.take_snapshot().compare_to(snapshot_before, 'lineno')
+        rss_after = peak_rss_mb()
+        stage_rss = max(frame['rss_peak'], _rss_high_water_mb() or 0.0) if per_stage_rss else None
+        stack.pop()
+        if stack:
+            stack[-1]['traced_peak'] = max(stack[-1]['traced_peak'], traced_peak)
+            if stage_rss is not None:
+                stack[-1]['rss_peak'] = max(stack[-1]['rss_peak'], stage_rss)
+
+        record.update({
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'peak_rss_mb': rss_after,
+            'peak_rss_growth_mb': rss_after - rss_before,
+            'stage_peak_rss_mb': stage_rss,
+            'traced_peak_mb': traced_peak / (1024 * 1024),
+            'top_allocations': [
+                {'location': str(stat.traceback[0]), 'size_diff_kb': stat.size_diff / 1024, 'count_diff': stat.count_diff}
+                for stat in stats[:TOP_ALLOCATIONS]
+            ],
+        })
+        if profiler:
+            os.makedirs(_state['output_dir'], exist_ok=True)
+            path = os.path.join(_state['output_dir'], f"{_state['run_id']}_{name}.prof")
+            profiler.dump_stats(path)
+            record['cprofile'] = path
+
+
+def profiled(name=None):
+    """装饰器形式的 profile_stage，默认以函数名作为阶段名"""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def write_report(path=None):
+    """
+    写出本次运行的汇总报告（JSON），便于不同运行之间比较
+    :return: str, 报告路径；未启用或没有记录时返回 None
+    """
+    if not _state['enabled'] or not _state['stages'] or _state['report_written']:
+        return None
+    path = path or os.path.join(_state['output_dir'], f"{_state['run_id']}_report.json")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    report = {
+        'run_id': _state['run_id'],
+        'argv': sys.argv,
+        'python': sys.version.split()[0],
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': _state['stages'],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    _state['report_written'] = True
+    print_summary(report)
+    print(f"性能报告已保存到 {path}")
+    return path
+
+
+def print_summary(report):
+    """
+    打印各阶段耗时与内存：能按阶段测量时打印阶段内的峰值 RSS，
+    否则打印进程峰值 RSS 在该阶段内的增长（peak_rss_mb 是进程生命周期的峰值，不能当作阶段峰值）
+    """
+    per_stage = all(stage.get('stage_peak_rss_mb') is not None for stage in report['stages'])
+    rss_key, rss_label = ('stage_peak_rss_mb', '阶段峰值RSS(MB)') if per_stage else ('peak_rss_growth_mb', 'RSS增长(MB)')
+    print(f"\n{'阶段':<30} {'墙钟(s)':>9} {'CPU(s)':>9} {rss_label:>14} {'tracemalloc峰值(MB)':>20}")
+    for stage in report['stages']:
+        label = '  ' * stage['depth'] + stage['name']
+        print(f"{label:<32} {stage['wall_seconds']:>9.3f} {stage['cpu_seconds']:>9.3f} "
+              f"{stage[rss_key]:>14.1f} {stage['traced_peak_mb']:>20.1f}")
+    print(f"进程峰值RSS: {report['peak_rss_mb']:.1f} MB")
+
+
+def compare_reports(path_a, path_b):
+    """按阶段名比较两次运行的耗时和内存"""
+    with open(path_a, encoding='utf-8') as f:
+        report_a = json.load(f)
+    with open(path_b, encoding='utf-8') as f:
+        report_b = json.load(f)
+
+    def totals(report):
+        result = {}
+        for stage in report['stages']:
+            entry = result.setdefault(stage['name'], {'wall': 0.0, 'cpu': 0.0, 'traced': 0.0})
+            entry['wall'] += stage['wall_seconds']
+            entry['cpu'] += stage['cpu_seconds']
+            entry['traced'] = max(entry['traced'], stage['traced_peak_mb'])
+        return result
+
+    a, b = totals(report_a), totals(report_b)
+    print(f"{'阶段':<28} {'墙钟 A(s)':>10} {'墙钟 B(s)':>10} {'变化':>8} {'内存 A(MB)':>11} {'内存 B(MB)':>11}")
+    for name in list(a) + [n for n in b if n not in a]:
+        sa, sb = a.get(name), b.get(name)
+        wall_a = f"{sa['wall']:.3f}" if sa else '-'
+        wall_b = f"{sb['wall']:.3f}" if sb else '-'
+        change = f"{(sb['wall'] / sa['wall'] - 1) * 100:+.0f}%" if sa and sb and sa['wall'] > 0 else '-'
+        mem_a = f"{sa['traced']:.1f}" if sa else '-'
+        mem_b = f"{sb['traced']:.1f}" if sb else '-'
+        print(f"{name:<30} {wall_a:>10} {wall_b:>10} {change:>8} {mem_a:>11} {mem_b:>11}")
+
+
+# 通过环境变量启用，覆盖 testgraph.py 等直接运行的脚本
+if os.getenv(PROFILE_ENV):
+    enable_profiling(cprofile=bool(os.getenv(CPROFILE_ENV)))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="比较两次运行的性能报告")
+    parser.add_argument("report_a")
+    parser.add_argument("report_b")
+    args = parser.parse_args()
+    compare_reports(args.report_a, args.report_b)
@@ -0,0 +1,104 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+import numpy as np
+
+from query_service import GRAPH_PATH, DEFAULT_PORT, SimilarityIndex
+
+
+def percentiles(latencies_ms):
+    """延迟分位数（毫秒）"""
+    values = np.asarray(latencies_ms)
+    return {
+        'count': int(values.size),
+        'p50': float(np.percentile(values, 50)),
+        'p90': float(np.percentile(values, 90)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
+
+
+def make_queries(index, num_queries, seed=42):
+    """随机生成 top-k、自我网络和带属性过滤的查询"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(num_queries):
+        ticker = rng.choice(index.tickers)
+        kind = rng.choice(('top', 'top_filtered', 'ego'))
+        queries.append((kind, ticker, rng.choice((5, 10, 20))))
+    return queries
+
+
+def run_in_process(index, queries):
+    """进程内直接调用索引，测量查询本身的延迟"""
+    latencies = {'top': [], 'top_filtered': [], 'ego': []}
+    for kind, ticker, k in queries:
+        start = time.perf_counter()
+        if kind == 'top':
+            index.top_k(ticker, k)
+        elif kind == 'top_filtered':
+            index.top_k(ticker, k, source='lowprice', min_weight=0.9)
+        else:
+            index.ego_network(ticker, k)
+        latencies[kind].append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run_http(base_url, queries, concurrency=8):
+    """通过 HTTP 并发请求，测量端到端延迟（含网络与序列化开销）"""
+    def fetch(query):
+        kind, ticker, k = query
+        if kind == 'ego':
+            url = f"{base_url}/ego?ticker={ticker}&k={k}"
+        elif kind == 'top_filtered':
+            url = f"{base_url}/neighbors?ticker={ticker}&k={k}&source=lowprice&min_weight=0.9"
+        else:
+            url = f"{base_url}/neighbors?ticker={ticker}&k={k}"
+        start = time.perf_counter()
+        with urlopen(url) as response:
+            payload = json.loads(response.read())
+        return kind, (time.perf_counter() - start) * 1000, payload.get('elapsed_ms', 0.0)
+
+    latencies = {'top': [], 'top_filtered': [], 'ego': []}
+    server_side = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for kind, elapsed, server_elapsed in executor.map(fetch, queries):
+            latencies[kind].append(elapsed)
+            server_side.append(server_elapsed)
+    return latencies, server_side
+
+
+def print_latencies(title, latencies):
+    print(f"\n{title}")
+    for kind, values in latencies.items():
+        if values:
+            stats = percentiles(values)
+            print(f"  {kind:<13} n={stats['count']:<6} p50={stats['p50']:.3f} ms  "
+                  f"p90={stats['p90']:.3f} ms  p99={stats['p99']:.3f} ms  max={stats['max']:.3f} ms")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="相似公司查询服务压测")
+    parser.add_argument("--graph", default=GRAPH_PATH)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--url", default=None, help=f"HTTP 服务地址，例如 http://127.0.0.1:{DEFAULT_PORT}")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = SimilarityIndex.load(args.graph)
+    print(f"索引加载耗时: {time.perf_counter() - start:.2f} 秒")
+    queries = make_queries(index, args.queries)
+
+    # 预热一轮，排除首次调用的开销
+    run_in_process(index, queries[:200])
+    print_latencies("进程内查询延迟", run_in_process(index, queries))
+
+    if args.url:
+        latencies, server_side = run_http(args.url.rstrip('/'), queries, args.concurrency)
+        print_latencies("HTTP 端到端延迟", latencies)
+        print_latencies("HTTP 服务端处理延迟", {'all': server_side})
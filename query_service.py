@@ -0,0 +1,296 @@
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+GRAPH_PATH = "nasdaq_lowprice_network.graphml"
+COMPANY_PATHS = (
+    "union_NDX_and_SP100/merged_indices_2025-03-10.csv",
+    "low_price_company_info/final_union_by_ticker.csv",
+)
+DEFAULT_PORT = 8765
+
+SOURCES = ('nasdaq100', 'lowprice')
+
+
+class SimilarityIndex:
+    """
+    常驻内存的相似公司查询索引
+    图和公司信息只加载一次，邻接关系存为 CSR 数组，每个节点的邻居按边权重降序排列
+    """
+
+    def __init__(self, G, companies=None):
+        self.tickers = [str(node) for node in G.nodes()]
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        # 折叠后的发行人节点：成员代码（如认股权证 ABCDW）也能查到所属发行人
+        for i, node in enumerate(G.nodes()):
+            for member in str(G.nodes[node].get('member_tickers', '')).split(','):
+                if member:
+                    self.index.setdefault(member, i)
+        n = len(self.tickers)
+
+        # 节点属性数组
+        self.source = np.array([SOURCES.index(G.nodes[node].get('source', 'lowprice'))
+                                if G.nodes[node].get('source') in SOURCES else -1 for node in G.nodes()],
+                               dtype=np.int8)
+        self.sic_code = np.array([float(G.nodes[node].get('sic_code', -1)) for node in G.nodes()])
+        self.market_cap = np.array([float(G.nodes[node].get('market_cap', 0)) for node in G.nodes()])
+        self.names = {}
+        if companies is not None:
+            self.names = dict(zip(companies['ticker'].astype(str), companies['name'].fillna('').astype(str)))
+
+        # 构建按权重降序排列的 CSR 邻接表
+        edges = list(G.edges(data='weight', default=0.0))
+        src = np.fromiter((self.index[str(u)] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+        dst = np.fromiter((self.index[str(v)] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+        weight = np.fromiter((float(w) for _, _, w in edges), dtype=float, count=len(edges))
+        heads = np.concatenate([src, dst])
+        tails = np.concatenate([dst, src])
+        weights = np.concatenate([weight, weight])
+        order = np.lexsort((-weights, heads))
+        self.neighbors = tails[order]
+        self.weights = weights[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(heads, minlength=n), out=self.indptr[1:])
+
+    @classmethod
+    def load(cls, graph_path=GRAPH_PATH, company_paths=COMPANY_PATHS):
+        """从 GraphML 和公司信息 CSV 加载索引"""
+        G = nx.read_graphml(graph_path)
+        frames = [pd.read_csv(path, usecols=['ticker', 'name']) for path in company_paths if os.path.exists(path)]
+        companies = pd.concat(frames, ignore_index=True).drop_duplicates(subset=['ticker']) if frames else None
+        return cls(G, companies)
+
+    def _describe(self, i, weight=None):
+        result = {
+            'ticker': self.tickers[i],
+            'name': self.names.get(self.tickers[i], ''),
+            'source': SOURCES[self.source[i]] if self.source[i] >= 0 else None,
+            'sic_code': int(self.sic_code[i]) if self.sic_code[i] >= 0 else None,
+            'market_cap': float(self.market_cap[i]),
+        }
+        if weight is not None:
+            result['weight'] = float(weight)
+        return result
+
+    def neighbor_slice(self, ticker, source=None, sic_code=None, min_market_cap=None, max_market_cap=None,
+                       min_weight=None):
+        """
+        返回某节点满足过滤条件的邻居下标与权重（已按权重降序）
+        :raises KeyError: ticker 不在网络中
+        :raises ValueError: source 不是 SOURCES 之一
+        """
+        if source is not None and source not in SOURCES:
+            raise ValueError(f"未知来源: {source}，可选: {', '.join(SOURCES)}")
+        i = self.index.get(ticker, self.index.get(ticker.upper()))
+        if i is None:
+            raise KeyError(ticker)
+        start, end = self.indptr[i], self.indptr[i + 1]
+        neighbors, weights = self.neighbors[start:end], self.weights[start:end]
+
+        mask = None
+        if source is not None:
+            mask = self.source[neighbors] == SOURCES.index(source)
+        if sic_code is not None:
+            m = self.sic_code[neighbors] == float(sic_code)
+            mask = m if mask is None else mask & m
+        if min_market_cap is not None:
+            m = self.market_cap[neighbors] >= min_market_cap
+            mask = m if mask is None else mask & m
+        if max_market_cap is not None:
+            m = self.market_cap[neighbors] <= max_market_cap
+            mask = m if mask is None else mask & m
+        if min_weight is not None:
+            # 权重已降序，用二分查找截断
+            cut = np.searchsorted(-weights, -min_weight, side='right')
+            neighbors, weights = neighbors[:cut], weights[:cut]
+            mask = mask[:cut] if mask is not None else None
+        if mask is not None:
+            neighbors, weights = neighbors[mask], weights[mask]
+        return i, neighbors, weights
+
+    def top_k(self, ticker, k=10, **filters):
+        """最相似的 k 个邻居（可按来源、SIC、市值区间、最小权重过滤）"""
+        _, neighbors, weights = self.neighbor_slice(ticker, **filters)
+        return [self._describe(j, w) for j, w in zip(neighbors[:k], weights[:k])]
+
+    def ego_network(self, ticker, k=20, **filters):
+        """
+        以 ticker 为中心的一跳自我网络：中心节点、前 k 个邻居以及这些节点之间的边
+        :return: dict, nodes 与 edges
+        """
+        center, neighbors, weights = self.neighbor_slice(ticker, **filters)
+        members = np.concatenate([[center], neighbors[:k]])
+        edges = [(self.tickers[center], self.tickers[j], float(w)) for j, w in zip(neighbors[:k], weights[:k])]
+        in_ego = np.zeros(len(self.tickers), dtype=bool)
+        in_ego[members[1:]] = True
+        for a in members[1:]:
+            start, end = self.indptr[a], self.indptr[a + 1]
+            others = self.neighbors[start:end]
+            inside = in_ego[others] & (others > a)
+            for b, w in zip(others[inside], self.weights[start:end][inside]):
+                edges.append((self.tickers[a], self.tickers[b], float(w)))
+        return {
+            'nodes': [self._describe(j) for j in members],
+            'edges': [{'source': u, 'target': v, 'weight': w} for u, v, w in edges],
+        }
+
+
+def parse_filters(params):
+    """将查询参数转换为 neighbor_slice 的过滤条件"""
+    filters = {}
+    if params.get('source'):
+        filters['source'] = params['source']
+    if params.get('sic'):
+        filters['sic_code'] = float(params['sic'])
+    if params.get('min_cap'):
+        filters['min_market_cap'] = float(params['min_cap'])
+    if params.get('max_cap'):
+        filters['max_market_cap'] = float(params['max_cap'])
+    if params.get('min_weight'):
+        filters['min_weight'] = float(params['min_weight'])
+    return filters
+
+
+def make_handler(index):
+    """生成绑定到索引的 HTTP 请求处理类"""
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                if url.path == '/health':
+                    self._send(200, {'status': 'ok', 'nodes': len(index.tickers)})
+                    return
+                if url.path not in ('/neighbors', '/ego'):
+                    self._send(404, {'error': f'未知路径: {url.path}'})
+                    return
+                ticker = params.get('ticker', '')
+                k = int(params.get('k', 10 if url.path == '/neighbors' else 20))
+                start = time.perf_counter()
+                if url.path == '/neighbors':
+                    result = {'ticker': ticker, 'neighbors': index.top_k(ticker, k, **parse_filters(params))}
+                else:
+                    result = index.ego_network(ticker, k, **parse_filters(params))
+                result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+                self._send(200, result)
+            except KeyError:
+                self._send(404, {'error': f'网络中没有股票: {params.get("ticker")}'})
+            except ValueError as e:
+                self._send(400, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            # 关闭逐请求日志，避免拖慢压测
+            pass
+
+    return QueryHandler
+
+
+def serve(index, host='127.0.0.1', port=DEFAULT_PORT):
+    """启动 HTTP 查询服务（阻塞）"""
+    server = ThreadingHTTPServer((host, port), make_handler(index))
+    print(f"查询服务已启动: http://{host}:{port}/neighbors?ticker=NVDA&k=10&source=lowprice")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def query_once(index, ticker, k=10, source=None):
+    """
+    单次查询并打印结果（query 子命令）
+    :return: int, 退出码；股票不存在或参数错误时打印与 REPL 相同的提示并返回 1
+    """
+    filters = {'source': source} if source else {}
+    try:
+        rows = index.top_k(ticker, k, **filters)
+    except KeyError:
+        print(f"网络中没有股票: {ticker}", file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 1
+    for row in rows:
+        print(f"{row['ticker']:<8} {row['weight']:.3f}  {row['source']:<10} {row['name']}")
+    return 0
+
+
+def repl(index):
+    """交互式命令行：top <TICKER> [k] / ego <TICKER> [k] / quit"""
+    print("命令: top <TICKER> [k] [source], ego <TICKER> [k], quit")
+    while True:
+        try:
+            line = input("> ").strip()
+        except EOFError:
+            break
+        if not line:
+            continue
+        parts = line.split()
+        if parts[0] in ('quit', 'exit'):
+            break
+        if parts[0] not in ('top', 'ego') or len(parts) < 2:
+            print("无法识别的命令")
+            continue
+        filters = {'source': parts[3]} if len(parts) > 3 else {}
+        start = time.perf_counter()
+        try:
+            k = int(parts[2]) if len(parts) > 2 else 10
+            if parts[0] == 'top':
+                result = index.top_k(parts[1], k, **filters)
+                elapsed = (time.perf_counter() - start) * 1000
+                for row in result:
+                    print(f"{row['ticker']:<8} {row['weight']:.3f}  {row['source']:<10} {row['name']}")
+            else:
+                result = index.ego_network(parts[1], k, **filters)
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"节点数: {len(result['nodes'])}, 边数: {len(result['edges'])}")
+            print(f"({elapsed:.3f} ms)")
+        except KeyError:
+            print(f"网络中没有股票: {parts[1]}")
+        except ValueError as e:
+            print(f"参数错误: {e}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="相似公司查询服务")
+    parser.add_argument("--graph", default=GRAPH_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="启动 HTTP 服务")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    query_parser = subparsers.add_parser("query", help="单次查询")
+    query_parser.add_argument("ticker")
+    query_parser.add_argument("-k", type=int, default=10)
+    query_parser.add_argument("--source", choices=SOURCES)
+    subparsers.add_parser("repl", help="交互式查询")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = SimilarityIndex.load(args.graph)
+    print(f"索引加载完成: {len(index.tickers)} 个节点, {len(index.neighbors) // 2} 条边, "
+          f"耗时 {time.perf_counter() - start:.2f} 秒")
+
+    if args.command == "serve":
+        serve(index, args.host, args.port)
+    elif args.command == "repl":
+        repl(index)
+    else:
+        sys.exit(query_once(index, args.ticker, args.k, args.source))
@@ -0,0 +1,169 @@
+import time
+import numpy as np
+
+from network_builder import W_TEXT, W_SIC, W_MARKET, THRESHOLD, normalize_rows, combine_similarity
+
+# 支持的精度
+PRECISIONS = ('float64', 'float32', 'float16', 'int8')
+
+# 分块矩阵乘法的块大小（行数）
+BLOCK_SIZE = 1024
+
+# 下游脚本使用的高相似度阈值（testgraph.py / testgraph2.py）
+REPORT_THRESHOLDS = (THRESHOLD, 0.93, 0.95)
+
+
+def quantize_embeddings(embeddings, precision='float16'):
+    """
+    对嵌入做 L2 归一化后降低存储精度
+    :param precision: 'float64' / 'float32' / 'float16' / 'int8'
+    :return: (values, scales)，int8 时 scales 为每个向量的缩放系数，其余精度为 None
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"不支持的精度: {precision}，可选: {', '.join(PRECISIONS)}")
+    unit = normalize_rows(np.asarray(embeddings, dtype=np.float64))
+    if precision != 'int8':
+        return unit.astype(precision), None
+
+    # 每个向量单独缩放到 [-127, 127]
+    scales = np.abs(unit).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    values = np.round(unit / scales[:, None]).astype(np.int8)
+    return values, scales.astype(np.float32)
+
+
+def reduced_precision_edges(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap, precision='float16',
+                            weights=(W_TEXT, W_SIC, W_MARKET), threshold=THRESHOLD, sim_return=None,
+                            block_size=BLOCK_SIZE):
+    """
+    低精度建图：两侧嵌入都只以 float16 / int8 形式保存，按 block_size × block_size 的块读取，
+    每块转换为 float32 后做矩阵乘法（int8 的乘积在 float32 中累加是精确的：768 维时 |累加和| <= 768 * 127^2 < 2^24），
+    并在同一块内用 float32 合成 SIC、市值（及收益率）相似度、按阈值取边，不生成完整的相似度矩阵
+    :param sim_return: np.ndarray, 可选的收益率相似度矩阵，需要 weights 含第四项
+    :return: (rows, cols, scores)，综合相似度超过阈值的股票对
+    """
+    if sim_return is not None and len(weights) < 4:
+        raise ValueError("启用收益率相关性时 weights 需要包含第四项权重")
+    values_a, scales_a = quantize_embeddings(nasdaq_emb, precision)
+    values_b, scales_b = quantize_embeddings(low_emb, precision)
+    w_text, w_sic, w_market = (np.float32(w) for w in weights[:3])
+
+    sic_a = nasdaq_df['sic_code'].to_numpy(dtype=float)
+    sic_b = low_df['sic_code'].to_numpy(dtype=float)
+    cap_a = (nasdaq_df['market_cap'].fillna(0).to_numpy(dtype=float) / max_cap).astype(np.float32)
+    cap_b = (low_df['market_cap'].fillna(0).to_numpy(dtype=float) / max_cap).astype(np.float32)
+
+    rows, cols, scores = [], [], []
+    for a_start in range(0, len(values_a), block_size):
+        a_end = a_start + block_size
+        a32 = values_a[a_start:a_end].astype(np.float32)
+        for b_start in range(0, len(values_b), block_size):
+            b_end = b_start + block_size
+            block = a32 @ values_b[b_start:b_end].astype(np.float32).T
+            if scales_a is not None:
+                block *= scales_a[a_start:a_end, None]
+                block *= scales_b[None, b_start:b_end]
+            block *= w_text
+            block += w_sic * (sic_a[a_start:a_end, None] == sic_b[None, b_start:b_end])
+            block += w_market * (1 - np.abs(cap_a[a_start:a_end, None] - cap_b[None, b_start:b_end]))
+            if sim_return is not None:
+                block += np.float32(weights[3]) * sim_return[a_start:a_end, b_start:b_end].astype(np.float32)
+            r, c = np.nonzero(block > threshold)
+            rows.append(r + a_start)
+            cols.append(c + b_start)
+            scores.append(block[r, c])
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(scores)
+
+
+def edge_mask(sim_matrix, threshold):
+    """
+    与下游一致的边判定：建图时要求综合相似度 > THRESHOLD，
+    testgraph 系列脚本再按保留三位小数后的权重过滤
+    """
+    return (sim_matrix > THRESHOLD) & (np.round(sim_matrix, 3) > threshold)
+
+
+def precision_report(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap,
+                     precisions=('float16', 'int8'), thresholds=REPORT_THRESHOLDS):
+    """
+    与 float64 基线比较低精度下的权重误差和边集合差异
+    低精度只用于嵌入的存储与读取，逐块的乘法与合成在 float32 中进行
+    :return: list[dict]，每个精度一条记录
+    """
+    baseline_text = normalize_rows(nasdaq_emb) @ normalize_rows(low_emb).T
+    baseline = combine_similarity(baseline_text, nasdaq_df, low_df, max_cap)
+    baseline_edges = {t: edge_mask(baseline, t) for t in thresholds}
+
+    report = []
+    for precision in precisions:
+        start = time.perf_counter()
+        # 与建图路径相同：逐块 float32 合成并取边
+        rows, cols, scores = reduced_precision_edges(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap, precision)
+        elapsed = time.perf_counter() - start
+
+        error = np.abs(scores.astype(np.float64) - baseline[rows, cols])
+        values_a, scales_a = quantize_embeddings(nasdaq_emb, precision)
+        values_b, scales_b = quantize_embeddings(low_emb, precision)
+        entry = {
+            'precision': precision,
+            'seconds': elapsed,
+            'embedding_bytes': values_a.nbytes + values_b.nbytes
+                               + (scales_a.nbytes + scales_b.nbytes if scales_a is not None else 0),
+            # 每块的 float32 中间结果：两侧转换后的嵌入块与相似度块
+            'similarity_bytes': 4 * (min(BLOCK_SIZE, len(nasdaq_df)) * (min(BLOCK_SIZE, len(low_df)) + values_a.shape[1])
+                                     + min(BLOCK_SIZE, len(low_df)) * values_b.shape[1]),
+            'max_weight_error': float(error.max()) if error.size else 0.0,
+            'mean_weight_error': float(error.mean()) if error.size else 0.0,
+        }
+        for t in thresholds:
+            mask = np.zeros(baseline.shape, dtype=bool)
+            mask[rows, cols] = np.round(scores, 3) > t
+            entry[f'edges@{t}'] = int(mask.sum())
+            entry[f'added@{t}'] = int((mask & ~baseline_edges[t]).sum())
+            entry[f'removed@{t}'] = int((~mask & baseline_edges[t]).sum())
+        report.append(entry)
+
+    baseline_entry = {
+        'precision': 'float64',
+        'embedding_bytes': np.asarray(nasdaq_emb, dtype=np.float64).nbytes + np.asarray(low_emb, dtype=np.float64).nbytes,
+        'similarity_bytes': baseline_text.nbytes,
+    }
+    for t in thresholds:
+        baseline_entry[f'edges@{t}'] = int(baseline_edges[t].sum())
+    return [baseline_entry] + report
+
+
+def print_precision_report(report, thresholds=REPORT_THRESHOLDS):
+    """打印精度报告"""
+    for entry in report:
+        print(f"\n精度: {entry['precision']}")
+        label = "分块 float32 计算占用" if 'max_weight_error' in entry else "相似度矩阵占用"
+        print(f"  嵌入占用: {entry['embedding_bytes'] / 1e6:.2f} MB, "
+              f"{label}: {entry['similarity_bytes'] / 1e6:.2f} MB")
+        if 'max_weight_error' in entry:
+            print(f"  计算耗时: {entry['seconds']:.3f} 秒")
+            print(f"  权重误差: 最大 {entry['max_weight_error']:.2e}, 平均 {entry['mean_weight_error']:.2e}")
+        for t in thresholds:
+            line = f"  阈值 {t}: 边数 {entry[f'edges@{t}']}"
+            if f'added@{t}' in entry:
+                line += f", 新增 {entry[f'added@{t}']}, 缺失 {entry[f'removed@{t}']}"
+            print(line)
+
+
+if __name__ == "__main__":
+    from network_builder import (
+        NASDAQ_PATH, LOW_PRICE_PATH, EMBEDDING_CACHE_PATH,
+        load_companies, market_cap_scale, load_embedding_cache, embed_descriptions,
+    )
+
+    nasdaq_df = load_companies(NASDAQ_PATH, 'nasdaq100')
+    low_df = load_companies(LOW_PRICE_PATH, 'lowprice')
+    max_cap = market_cap_scale(nasdaq_df, low_df)
+
+    cache = load_embedding_cache(EMBEDDING_CACHE_PATH)
+    nasdaq_emb = embed_descriptions(nasdaq_df['description'].tolist(), cache)
+    low_emb = embed_descriptions(low_df['description'].tolist(), cache)
+
+    print_precision_report(precision_report(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap))
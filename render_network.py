@@ -0,0 +1,153 @@
+import time
+import tracemalloc
+import numpy as np
+import networkx as nx
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+
+from profiling import profile_stage, peak_rss_mb
+
+# 只给 PageRank 最高的前 N 个节点绘制标签
+TOP_N_LABELS = 30
+
+# 输出 PDF / SVG 等矢量格式时，边数超过该值则将边集合栅格化，避免文件过大（PNG 本身就是栅格输出，不受影响）
+RASTERIZE_EDGES_ABOVE = 2000
+
+
+def render_network_headless(G, output_file="high_similarity_nasdaq_network.png", pos=None,
+                            top_n_labels=TOP_N_LABELS, rasterize_edges_above=RASTERIZE_EDGES_ABOVE,
+                            figsize=(20, 20), dpi=150, layout_iterations=100, title="NASDAQ高相似度股票网络",
+                            source_graph=None, threshold=None):
+    """
+    无界面快速绘制网络：直接使用 Agg 画布，不经过 pyplot，也不会调用 show() 阻塞
+    边用一个 LineCollection、节点用一次 scatter 批量绘制，只标注 PageRank 最高的节点
+    :param output_file: str, 输出路径，按扩展名选择格式（.png / .pdf / .svg 等）
+    :param pos: dict, 预先计算好的布局；为 None 时使用 spring_layout
+    :param rasterize_edges_above: int, 矢量输出时边数超过该值则栅格化边集合
+    :param layout_iterations: int, spring_layout 迭代次数
+    :param source_graph: nx.Graph, G 过滤前的原图；与 threshold 一起给出时社区分区与社区网格共用缓存
+    :param threshold: float, 由 source_graph 得到 G 时使用的边权重阈值
+    :return: dict, 布局、PageRank、社区检测、绘制各阶段耗时（秒）和内存峰值（MB）
+    """
+    # 性能分析已开启 tracemalloc 时不重复启动，也不在结束时关闭
+    owns_tracing = not tracemalloc.is_tracing()
+    if owns_tracing:
+        tracemalloc.start()
+    start = time.perf_counter()
+
+    nodes = list(G.nodes())
+    if pos is None:
+        with profile_stage("layout"):
+            pos = nx.spring_layout(G, k=1, iterations=layout_iterations, seed=42)
+    layout_seconds = time.perf_counter() - start
+
+    # 计算节点的PageRank值用于节点大小
+    with profile_stage("pagerank"):
+        pr = nx.pagerank(G)
+    pagerank = np.array([pr[node] for node in nodes])
+    pagerank_seconds = time.perf_counter() - start - layout_seconds
+
+    # 社区检测失败时按节点度着色
+    try:
+        from community_detection import cached_best_partition
+
+        if source_graph is not None:
+            communities = cached_best_partition(source_graph, threshold)
+        else:
+            communities = cached_best_partition(G)
+        node_colors = np.array([communities[node] for node in nodes])
+        cmap = matplotlib.colormaps['tab20'].resampled(max(node_colors.max() + 1, 1))
+    except Exception:
+        node_colors = np.array([G.degree(node) for node in nodes])
+        cmap = matplotlib.colormaps['viridis']
+    community_seconds = time.perf_counter() - start - layout_seconds - pagerank_seconds
+
+    fig = Figure(figsize=figsize, dpi=dpi, facecolor='white')
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+
+    # 绘制边：一次性提交全部线段
+    xy = np.array([pos[node] for node in nodes]) if nodes else np.zeros((0, 2))
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = list(G.edges(data='weight', default=0.0))
+    if edges:
+        src = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+        dst = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+        widths = 3 * np.fromiter((float(w) for _, _, w in edges), dtype=float, count=len(edges))
+        segments = np.stack([xy[src], xy[dst]], axis=1)
+        lines = LineCollection(segments, linewidths=widths, colors='gray', alpha=0.5, zorder=1)
+        lines.set_rasterized(len(edges) > rasterize_edges_above)
+        ax.add_collection(lines)
+
+    # 绘制节点：一次 scatter
+    if nodes:
+        ax.scatter(xy[:, 0], xy[:, 1], s=8000 * pagerank, c=node_colors, cmap=cmap, alpha=0.7,
+                   edgecolors='white', linewidths=1, zorder=2)
+
+    # 只为 PageRank 最高的节点绘制标签
+    for i in np.argsort(-pagerank)[:top_n_labels]:
+        ax.text(xy[i, 0], xy[i, 1], str(nodes[i]), fontsize=8, fontweight='bold',
+                ha='center', va='center', zorder=3)
+
+    ax.set_title(title, fontsize=20, fontweight='bold', pad=20)
+    legend_text = (
+        "节点颜色：不同社区群组\n"
+        "节点大小：PageRank中心性\n"
+        "边的粗细：相似度强度\n"
+        f"节点数量：{G.number_of_nodes()}\n"
+        f"边数量：{G.number_of_edges()}"
+    )
+    ax.text(0.02, 0.02, legend_text, transform=ax.transAxes, fontsize=14,
+            bbox=dict(facecolor='white', alpha=0.8))
+    ax.autoscale_view()
+    ax.axis('off')
+
+    with profile_stage("savefig"):
+        fig.savefig(output_file, dpi=dpi, facecolor='white')
+    elapsed = time.perf_counter() - start
+    _, traced_peak = tracemalloc.get_traced_memory()
+    if owns_tracing:
+        tracemalloc.stop()
+
+    stats = {
+        'layout_seconds': layout_seconds,
+        'pagerank_seconds': pagerank_seconds,
+        'community_seconds': community_seconds,
+        # 只含绘制与保存，不含布局、PageRank 和社区检测
+        'render_seconds': elapsed - layout_seconds - pagerank_seconds - community_seconds,
+        'total_seconds': elapsed,
+        'traced_peak_mb': traced_peak / (1024 * 1024),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    print(f"图像已保存为 {output_file}")
+    print(f"布局耗时: {stats['layout_seconds']:.2f} 秒, PageRank 耗时: {stats['pagerank_seconds']:.2f} 秒, "
+          f"社区检测耗时: {stats['community_seconds']:.2f} 秒, 绘制耗时: {stats['render_seconds']:.2f} 秒, "
+          f"Python 内存峰值: {stats['traced_peak_mb']:.1f} MB, 进程峰值 RSS: {stats['peak_rss_mb']:.1f} MB")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    from community_detection import threshold_subgraph
+
+    parser = argparse.ArgumentParser(description="无界面快速绘制高相似度网络")
+    parser.add_argument("--graph", default="nasdaq_lowprice_network.graphml")
+    parser.add_argument("--threshold", type=float, default=0.95)
+    parser.add_argument("--output", default="high_similarity_nasdaq_network.png", help="输出文件（.png / .pdf / .svg）")
+    parser.add_argument("--labels", type=int, default=TOP_N_LABELS, help="标注 PageRank 最高的前 N 个节点")
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--rasterize-edges-above", type=int, default=RASTERIZE_EDGES_ABOVE,
+                        help="矢量输出时边数超过该值则栅格化边集合")
+    args = parser.parse_args()
+
+    with profile_stage("load_graphml"):
+        G = nx.read_graphml(args.graph)
+        G_filtered = threshold_subgraph(G, args.threshold)
+    print(f"过滤后的图: 节点数量: {G_filtered.number_of_nodes()}, 边数量: {G_filtered.number_of_edges()}")
+    with profile_stage("render"):
+        render_network_headless(G_filtered, args.output, top_n_labels=args.labels,
+                                rasterize_edges_above=args.rasterize_edges_above, dpi=args.dpi,
+                                title=f"NASDAQ高相似度股票网络\n(相似度 > {args.threshold})",
+                                source_graph=G, threshold=args.threshold)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# 计算相关系数所需的最少共同交易日数，不足时视为无相关性
+MIN_PERIODS = 10
+
+# 分块矩阵乘法的块大小（行数）
+BLOCK_SIZE = 1024
+
+
+def load_history(paths):
+    """
+    读取 get_stock_history 保存的历史数据 CSV（可多个）
+    :param paths: list[str], 历史数据文件路径
+    :return: DataFrame，包含 ticker, date, close
+    """
+    frames = [pd.read_csv(path, usecols=['ticker', 'date', 'close']) for path in paths]
+    if not frames:
+        return pd.DataFrame(columns=['ticker', 'date', 'close'])
+    history = pd.concat(frames, ignore_index=True)
+    return history.drop_duplicates(subset=['ticker', 'date'], keep='last')
+
+
+def build_returns_matrix(history_df, tickers):
+    """
+    将历史数据透视为 ticker × 日期 的日收益率矩阵
+    缺失的交易日不做前向填充：某日或前一交易日缺少收盘价时，该日收益率记为 NaN
+    :param tickers: list[str], 行顺序；没有历史数据的 ticker 整行为 NaN
+    :return: (returns, dates)，returns 为 np.ndarray，形状 (len(tickers), len(dates) - 1)
+    """
+    closes = history_df.pivot_table(index='ticker', columns='date', values='close', aggfunc='last')
+    closes = closes.reindex(index=tickers, columns=sorted(closes.columns))
+    values = closes.to_numpy(dtype=float)
+    if values.shape[1] < 2:
+        return np.full((len(tickers), 0), np.nan), list(closes.columns)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values[:, 1:] / values[:, :-1] - 1
+    returns[~np.isfinite(returns)] = np.nan
+    return returns, list(closes.columns[1:])
+
+
+def return_correlation(returns_a, returns_b, min_periods=MIN_PERIODS, block_size=BLOCK_SIZE):
+    """
+    两组股票之间日收益率的 Pearson 相关系数（只使用双方都有数据的交易日）
+    通过掩码矩阵乘法一次性得到所有股票对的计数、和、平方和及交叉积，无需逐对计算
+    :return: np.ndarray, 形状 (len(returns_a), len(returns_b))；共同交易日不足或方差为 0 时为 0
+    """
+    mask_b = np.isfinite(returns_b).astype(float)
+    x_b = np.where(mask_b > 0, returns_b, 0.0)
+    x_b2 = x_b * x_b
+
+    result = np.zeros((len(returns_a), len(returns_b)))
+    for start in range(0, len(returns_a), block_size):
+        block = returns_a[start:start + block_size]
+        mask_a = np.isfinite(block).astype(float)
+        x_a = np.where(mask_a > 0, block, 0.0)
+
+        n = mask_a @ mask_b.T
+        sum_a = x_a @ mask_b.T
+        sum_b = mask_a @ x_b.T
+        sum_aa = (x_a * x_a) @ mask_b.T
+        sum_bb = mask_a @ x_b2.T
+        sum_ab = x_a @ x_b.T
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sum_ab - sum_a * sum_b / n
+            var_a = sum_aa - sum_a * sum_a / n
+            var_b = sum_bb - sum_b * sum_b / n
+            corr = cov / np.sqrt(var_a * var_b)
+        valid = (n >= min_periods) & (var_a > 0) & (var_b > 0) & np.isfinite(corr)
+        result[start:start + block_size] = np.where(valid, np.clip(corr, -1.0, 1.0), 0.0)
+    return result
+
+
+def return_similarity(nasdaq_df, low_df, history_df, min_periods=MIN_PERIODS):
+    """
+    价格联动相似度：收益率相关系数，负相关截断为 0，取值范围 [0, 1]
+    :return: np.ndarray, 形状 (len(nasdaq_df), len(low_df))
+    """
+    returns_a, _ = build_returns_matrix(history_df, nasdaq_df['ticker'].tolist())
+    returns_b, _ = build_returns_matrix(history_df, low_df['ticker'].tolist())
+    return np.maximum(return_correlation(returns_a, returns_b, min_periods), 0.0)
+
+
+if __name__ == "__main__":
+    import argparse
+    from network_builder import NASDAQ_PATH, LOW_PRICE_PATH, load_companies
+
+    parser = argparse.ArgumentParser(description="计算纳斯达克100与低价股之间的收益率相关性")
+    parser.add_argument("history", nargs="+", help="历史数据 CSV 文件")
+    parser.add_argument("--low-price", default=LOW_PRICE_PATH)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    nasdaq_df = load_companies(NASDAQ_PATH, 'nasdaq100')
+    low_df = load_companies(args.low_price, 'lowprice')
+    corr = return_similarity(nasdaq_df, low_df, load_history(args.history))
+
+    flat = np.argsort(-corr, axis=None)[:args.top]
+    print(f"\n收益率相关性最高的 {args.top} 对股票:")
+    for i, j in zip(*np.unravel_index(flat, corr.shape)):
+        print(f"{nasdaq_df['ticker'].iloc[i]} - {low_df['ticker'].iloc[j]}: {corr[i, j]:.3f}")
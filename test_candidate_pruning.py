@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import candidate_pruning
+from candidate_pruning import generate_candidates
+from network_builder import RETURN_WEIGHTS, THRESHOLD, combine_similarity, market_cap_scale, normalize_rows
+
+
+def make_companies(rng, n, source):
+    """随机公司表：少量 SIC 代码（含缺失）、跨多个数量级的市值（含缺失）"""
+    sic = rng.choice([1311.0, 2834.0, 3674.0, 6022.0, 7372.0, np.nan], size=n)
+    cap = 10 ** rng.uniform(6, 12, size=n)
+    cap[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({'ticker': [f"{source[:1].upper()}{i}" for i in range(n)], 'description': '',
+                         'sic_code': sic, 'market_cap': cap, 'source': source})
+
+
+def exhaustive_edges(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap, weights, sim_return=None):
+    sim_text = normalize_rows(nasdaq_emb) @ normalize_rows(low_emb).T
+    full = combine_similarity(sim_text, nasdaq_df, low_df, max_cap, weights, sim_return)
+    rows, cols = np.nonzero(full > THRESHOLD)
+    return dict(zip(zip(rows.tolist(), cols.tolist()), full[rows, cols].tolist()))
+
+
+def assert_matches_exhaustive(nasdaq_df, low_df, nasdaq_emb, low_emb, weights=(0.7, 0.2, 0.1), sim_return=None):
+    max_cap = market_cap_scale(nasdaq_df, low_df)
+    rows, cols, scores, stats = generate_candidates(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap, weights,
+                                                    THRESHOLD, sim_return=sim_return)
+    expected = exhaustive_edges(nasdaq_df, low_df, nasdaq_emb, low_emb, max_cap, weights, sim_return)
+    pruned = dict(zip(zip(rows.tolist(), cols.tolist()), scores.tolist()))
+    assert pruned.keys() == expected.keys()
+    assert np.allclose([pruned[k] for k in expected], list(expected.values()), rtol=0, atol=1e-9)
+    return stats
+
+
+@pytest.fixture
+def companies():
+    rng = np.random.default_rng(0)
+    return make_companies(rng, 120, 'nasdaq100'), make_companies(rng, 900, 'lowprice')
+
+
+def clustered_embeddings(rng, nasdaq_df, low_df, dim=32):
+    sic = pd.concat([nasdaq_df['sic_code'], low_df['sic_code']]).fillna(-1).to_numpy()
+    centers = {code: rng.normal(size=dim) for code in np.unique(sic)}
+    emb = np.vstack([centers[code] + 0.3 * rng.normal(size=dim) for code in sic])
+    return emb[:len(nasdaq_df)], emb[len(nasdaq_df):]
+
+
+def anisotropic_embeddings(rng, nasdaq_df, low_df, dim=32, scale=3.0):
+    """与 BERT 平均池化相近：所有向量共享一个主方向，中位余弦约 0.9，且不按 SIC 聚类"""
+    emb = scale * rng.normal(size=dim) + rng.normal(size=(len(nasdaq_df) + len(low_df), dim))
+    return emb[:len(nasdaq_df)], emb[len(nasdaq_df):]
+
+
+def test_clustered_embeddings_prune_and_match(companies):
+    nasdaq_df, low_df = companies
+    stats = assert_matches_exhaustive(nasdaq_df, low_df, *clustered_embeddings(np.random.default_rng(1), *companies))
+    assert stats['candidate_pairs'] < stats['total_pairs']
+
+
+def test_clustered_embeddings_with_return_term(companies):
+    nasdaq_df, low_df = companies
+    rng = np.random.default_rng(2)
+    sim_return = rng.uniform(0, 1, size=(len(nasdaq_df), len(low_df)))
+    assert_matches_exhaustive(nasdaq_df, low_df, *clustered_embeddings(rng, *companies), RETURN_WEIGHTS, sim_return)
+
+
+def test_anisotropic_embeddings_fall_back_to_dense(companies):
+    nasdaq_df, low_df = companies
+    stats = assert_matches_exhaustive(nasdaq_df, low_df, *anisotropic_embeddings(np.random.default_rng(3), *companies))
+    assert stats['dense_fallback']
+
+
+@pytest.mark.parametrize('scale', [0.5, 1.0, 3.0])
+def test_block_path_matches_on_non_clustered_embeddings(companies, monkeypatch, scale):
+    # 关闭稠密回退，强制走逐块打分路径
+    monkeypatch.setattr(candidate_pruning, 'DENSE_FRACTION', 1.0)
+    nasdaq_df, low_df = companies
+    emb = anisotropic_embeddings(np.random.default_rng(4), *companies, scale=scale)
+    stats = assert_matches_exhaustive(nasdaq_df, low_df, *emb)
+    assert not stats['dense_fallback']
+
+
+def test_zero_embeddings_are_never_pruned(companies):
+    nasdaq_df, low_df = companies
+    nasdaq_emb, low_emb = anisotropic_embeddings(np.random.default_rng(5), *companies)
+    nasdaq_emb[::7] = 0
+    low_emb[::5] = 0
+    assert_matches_exhaustive(nasdaq_df, low_df, nasdaq_emb, low_emb)
@@ -1,10 +1,14 @@
+import sys
 import networkx as nx
+import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
-from community import community_louvain
+from community_detection import cached_best_partition
+from profiling import profile_stage, profiled
 
-# 加载图
-G = nx.read_graphml("nasdaq_lowprice_network.graphml")
+# 加载图（设置 QT4MC_PROFILE=1 时记录各阶段耗时与内存）
+with profile_stage("load_graphml"):
+    G = nx.read_graphml("nasdaq_lowprice_network.graphml")
 print(f"原始图: 节点数量: {G.number_of_nodes()}, 边数量: {G.number_of_edges()}")
 
 # 创建一个只包含权重大于0.95的边的子图
@@ -15,22 +19,28 @@ G_filtered = G.edge_subgraph(high_similarity_edges)
 G_filtered = G_filtered.subgraph([n for n in G_filtered.nodes() if G_filtered.degree(n) > 0])
 print(f"过滤后的图: 节点数量: {G_filtered.number_of_nodes()}, 边数量: {G_filtered.number_of_edges()}")
 
-def visualize_high_similarity_network(G, output_file="high_similarity_nasdaq_network.png"):
+@profiled("visualize")
+def visualize_high_similarity_network(G, output_file="high_similarity_nasdaq_network.png", G_source=None):
     """可视化高相似度网络"""
     plt.figure(figsize=(20, 20), dpi=300)
     
     # 使用 spring_layout 布局，增加节点间距
-    pos = nx.spring_layout(G, k=1, iterations=100, seed=42)
+    with profile_stage("layout"):
+        pos = nx.spring_layout(G, k=1, iterations=100, seed=42)
     
     # 计算节点的PageRank值用于节点大小
-    pr = nx.pagerank(G)
+    with profile_stage("pagerank"):
+        pr = nx.pagerank(G)
     
-    # 尝试进行社区检测
+    # 尝试进行社区检测（分区按 (原图, 阈值) 缓存，与 community_detection 的参数网格共用）
     try:
-        communities = community_louvain.best_partition(G)
+        if G_source is not None:
+            communities = cached_best_partition(G_source, 0.95)
+        else:
+            communities = cached_best_partition(G)
         node_colors = [communities[node] for node in G.nodes()]
-        cmap = plt.cm.get_cmap('tab20', max(communities.values()) + 1)
-    except:
+        cmap = matplotlib.colormaps['tab20'].resampled(max(communities.values()) + 1)
+    except Exception:
         node_colors = list(dict(G.degree()).values())
         cmap = plt.cm.viridis
     
@@ -79,15 +89,23 @@ def visualize_high_similarity_network(G, output_file="high_similarity_nasdaq_net
     plt.tight_layout()
     
     # 保存高分辨率图像
-    plt.savefig(output_file, dpi=300, bbox_inches='tight', facecolor='white')
+    with profile_stage("savefig"):
+        plt.savefig(output_file, dpi=300, bbox_inches='tight', facecolor='white')
     print(f"图像已保存为 {output_file}")
     plt.show()
 
-# 可视化高相似度网络
-visualize_high_similarity_network(G_filtered)
+# 可视化高相似度网络（批处理服务器上使用 --headless：Agg 画布、批量绘制、不调用 plt.show()）
+if "--headless" in sys.argv:
+    from render_network import render_network_headless
+    with profile_stage("visualize"):
+        render_network_headless(G_filtered, title="NASDAQ高相似度股票网络\n(相似度 > 0.95)",
+                                source_graph=G, threshold=0.95)
+else:
+    visualize_high_similarity_network(G_filtered, G_source=G)
 
 # 导出到Gephi
-nx.write_gexf(G_filtered, "nasdaq_high_similarity_network.gexf")
+with profile_stage("export_gexf"):
+    nx.write_gexf(G_filtered, "nasdaq_high_similarity_network.gexf")
 print("已导出高相似度网络到 nasdaq_high_similarity_network.gexf，可在Gephi中打开")
 
 # 打印一些网络统计信息
@@ -1,5 +1,5 @@
 import networkx as nx
-from community import community_louvain
+from community_detection import cached_best_partition
 from pyvis.network import Network
 
 # -------------------------------
@@ -24,9 +24,9 @@ print(f"过滤后的图: 节点数量: {G_filtered.number_of_nodes()}, 边数量
 # 计算 PageRank 值
 pr = nx.pagerank(G_filtered)
 
-# 使用 Louvain 方法进行社区检测
+# 使用 Louvain 方法进行社区检测（分区按 (原图, 阈值) 缓存，与 community_detection 的参数网格共用）
 try:
-    communities = community_louvain.best_partition(G_filtered)
+    communities = cached_best_partition(G, 0.93)
 except Exception as e:
     print("社区检测失败，使用默认社区。")
     communities = {node: 0 for node in G_filtered.nodes()}
@@ -0,0 +1,249 @@
+import os
+import time
+import numpy as np
+
+from company_dedup import unique_descriptions
+from network_builder import (
+    EMBEDDING_CACHE_PATH, CALIBRATION_PATH, THRESHOLD,
+    load_embedding_cache, save_embedding_cache, embed_descriptions, normalize_rows, combine_similarity,
+)
+
+# 哈希 n-gram 后端的特征维度
+HASH_FEATURES = 2 ** 18
+
+# 校准映射使用的分位点数量
+CALIBRATION_QUANTILES = 1001
+
+# 综合相似度公式和阈值是按 BERT 相似度的尺度设定的，其他后端都校准到该尺度
+CALIBRATION_REFERENCE = 'bert'
+
+
+def bert_text_similarity(nasdaq_descriptions, low_descriptions, cache_path=EMBEDDING_CACHE_PATH):
+    """
+    BERT 平均池化嵌入的余弦相似度（原 notebook 的做法）
+    :return: np.ndarray, 形状 (len(nasdaq_descriptions), len(low_descriptions))
+    """
+    cache = load_embedding_cache(cache_path)
+    nasdaq_emb = embed_descriptions(nasdaq_descriptions, cache)
+    low_emb = embed_descriptions(low_descriptions, cache)
+    save_embedding_cache(cache, cache_path)
+    return normalize_rows(nasdaq_emb) @ normalize_rows(low_emb).T
+
+
+def tfidf_text_similarity(nasdaq_descriptions, low_descriptions, cache_path=None):
+    """
+    TF-IDF 稀疏向量的余弦相似度：IDF 在两侧描述的并集上拟合，用稀疏矩阵乘法计算跨来源相似度
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(stop_words='english', sublinear_tf=True, min_df=1)
+    vectorizer.fit([str(text) for text in nasdaq_descriptions] + [str(text) for text in low_descriptions])
+    # TfidfVectorizer 默认做 L2 归一化，点积即为余弦相似度
+    nasdaq_vec = vectorizer.transform([str(text) for text in nasdaq_descriptions])
+    low_vec = vectorizer.transform([str(text) for text in low_descriptions])
+    return (nasdaq_vec @ low_vec.T).toarray()
+
+
+def hashing_text_similarity(nasdaq_descriptions, low_descriptions, cache_path=None):
+    """
+    字符 n-gram 哈希向量的余弦相似度：无需拟合词表，适合每日增量刷新
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    vectorizer = HashingVectorizer(analyzer='char_wb', ngram_range=(3, 5), n_features=HASH_FEATURES,
+                                   alternate_sign=False, norm='l2')
+    nasdaq_vec = vectorizer.transform([str(text) for text in nasdaq_descriptions])
+    low_vec = vectorizer.transform([str(text) for text in low_descriptions])
+    return (nasdaq_vec @ low_vec.T).toarray()
+
+
+# 可用的文本相似度后端
+TEXT_BACKENDS = {
+    'bert': bert_text_similarity,
+    'tfidf': tfidf_text_similarity,
+    'hashing': hashing_text_similarity,
+}
+
+
+def get_text_backend(name):
+    """按名称获取文本相似度后端"""
+    if name not in TEXT_BACKENDS:
+        raise ValueError(f"未知的文本相似度后端: {name}，可选: {', '.join(TEXT_BACKENDS)}")
+    return TEXT_BACKENDS[name]
+
+
+def fit_calibration(source_sim, target_sim, num_quantiles=CALIBRATION_QUANTILES):
+    """
+    分位数映射：把 source_sim 的分布单调地映射到 target_sim 的分布上
+    稀疏后端的余弦值整体偏低（TF-IDF 中位数约 0.01），直接代入按 BERT 尺度设定的公式几乎不会产生边
+    :return: dict, source / target 两个分位点数组
+    """
+    levels = np.linspace(0, 1, num_quantiles)
+    source = np.quantile(np.ravel(source_sim), levels)
+    target = np.quantile(np.ravel(target_sim), levels)
+    # 源分布中大量相同取值（如余弦为 0）对应多个分位点，取这些分位点目标值的均值
+    source, inverse = np.unique(source, return_inverse=True)
+    target = np.bincount(inverse, weights=target) / np.bincount(inverse)
+    return {'source': source, 'target': target}
+
+
+def apply_calibration(sim, calibration):
+    """按分位数映射把相似度转换到参考后端的尺度（分位点之间线性插值，超出范围时取端点）"""
+    if len(calibration['source']) == 1:
+        return np.full(np.shape(sim), calibration['target'][0])
+    return np.interp(sim, calibration['source'], calibration['target'])
+
+
+def load_calibration(backend, path=CALIBRATION_PATH):
+    """
+    读取某个后端的校准映射
+    :return: dict, source / target / reference；没有校准时返回 None
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if f'{backend}_source' not in data:
+            return None
+        return {'source': data[f'{backend}_source'], 'target': data[f'{backend}_target'],
+                'reference': str(data[f'{backend}_reference'])}
+
+
+def save_calibration(backend, calibration, reference=CALIBRATION_REFERENCE, path=CALIBRATION_PATH):
+    """保存校准映射，同一文件中其他后端的校准保留不变"""
+    arrays = {}
+    if os.path.exists(path):
+        with np.load(path) as data:
+            arrays = {key: data[key] for key in data.files}
+    arrays[f'{backend}_source'] = calibration['source']
+    arrays[f'{backend}_target'] = calibration['target']
+    arrays[f'{backend}_reference'] = np.array(reference)
+    np.savez(path, **arrays)
+
+
+def calibrate_backend(nasdaq_df, low_df, backend, reference=CALIBRATION_REFERENCE,
+                      cache_path=EMBEDDING_CACHE_PATH, calibration_path=CALIBRATION_PATH):
+    """
+    用参考后端（默认读取 BERT 嵌入缓存）在同一批描述上拟合校准映射并保存，只需运行一次
+    :return: dict, 校准映射
+    """
+    source_sim = compute_text_similarity(nasdaq_df, low_df, backend, cache_path, calibration_path=None)
+    target_sim = compute_text_similarity(nasdaq_df, low_df, reference, cache_path, calibration_path=None)
+    calibration = fit_calibration(source_sim, target_sim)
+    save_calibration(backend, calibration, reference, calibration_path)
+    calibration['reference'] = reference
+    return calibration
+
+
+def compute_text_similarity(nasdaq_df, low_df, backend='bert', cache_path=EMBEDDING_CACHE_PATH,
+                            calibration_path=CALIBRATION_PATH):
+    """
+    使用指定后端计算跨来源文本相似度矩阵
+    每种（归一化后的）描述只计算一次，再按行列展开回原始形状
+    非 BERT 后端的结果会按校准映射转换到 BERT 的尺度
+    :param calibration_path: str, 校准文件；为 None 时返回未校准的原始余弦值
+    :return: np.ndarray, 形状 (len(nasdaq_df), len(low_df))
+    :raises ValueError: 非 BERT 后端尚未校准
+    """
+    calibration = None
+    if backend != CALIBRATION_REFERENCE and calibration_path is not None:
+        calibration = load_calibration(backend, calibration_path)
+        if calibration is None:
+            raise ValueError(f"文本相似度后端 {backend} 尚未校准到 BERT 尺度，"
+                             f"请先运行: python cli.py calibrate --backend {backend}")
+    nasdaq_unique, nasdaq_inverse = unique_descriptions(nasdaq_df['description'])
+    low_unique, low_inverse = unique_descriptions(low_df['description'])
+    sim_text = get_text_backend(backend)(nasdaq_unique, low_unique, cache_path=cache_path)
+    if calibration is not None:
+        sim_text = apply_calibration(sim_text, calibration)
+    if len(nasdaq_unique) == len(nasdaq_df) and len(low_unique) == len(low_df):
+        return sim_text
+    return sim_text[np.ix_(nasdaq_inverse, low_inverse)]
+
+
+def top_edge_set(sim_matrix, k):
+    """综合相似度最高的 k 个股票对（按 (行, 列) 下标）"""
+    flat = sim_matrix.ravel()
+    k = min(k, flat.size)
+    top = np.argpartition(-flat, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+    rows, cols = np.unravel_index(top, sim_matrix.shape)
+    return set(zip(rows.tolist(), cols.tolist()))
+
+
+def _agreement(reference_combined, backend_combined, top_ks, threshold):
+    """两套综合相似度矩阵在最强边和阈值边集合上的一致程度"""
+    results = {}
+    for k in top_ks:
+        ref_top = top_edge_set(reference_combined, k)
+        fast_top = top_edge_set(backend_combined, k)
+        results[f'top{k}_overlap'] = len(ref_top & fast_top) / max(len(ref_top), 1)
+
+    ref_edges = set(zip(*[idx.tolist() for idx in np.nonzero(reference_combined > threshold)]))
+    fast_edges = set(zip(*[idx.tolist() for idx in np.nonzero(backend_combined > threshold)]))
+    union = ref_edges | fast_edges
+    results['threshold_jaccard'] = len(ref_edges & fast_edges) / len(union) if union else 1.0
+    results['reference_edges'] = len(ref_edges)
+    results['backend_edges'] = len(fast_edges)
+    return results
+
+
+def evaluate_backend_agreement(nasdaq_df, low_df, max_cap, backend='tfidf', reference='bert',
+                               top_ks=(100, 1000, 10000), threshold=THRESHOLD,
+                               cache_path=EMBEDDING_CACHE_PATH, calibration_path=CALIBRATION_PATH):
+    """
+    比较快速后端与参考后端（默认 BERT）得到的最强边的一致程度，分别给出校准前后的结果
+    没有保存的校准映射时在本批数据上现场拟合（样本内评估，结果偏乐观）
+    :return: dict, 'raw' 与 'calibrated' 两组一致性指标，以及耗时和校准来源
+    """
+    results = {}
+    sim_text = {}
+    for name in (reference, backend):
+        start = time.perf_counter()
+        sim_text[name] = compute_text_similarity(nasdaq_df, low_df, name, cache_path, calibration_path=None)
+        results[f'{name}_seconds'] = time.perf_counter() - start
+
+    calibration = load_calibration(backend, calibration_path) if calibration_path else None
+    results['calibration'] = 'saved' if calibration is not None else 'in-sample'
+    if calibration is None:
+        calibration = fit_calibration(sim_text[backend], sim_text[reference])
+
+    reference_combined = combine_similarity(sim_text[reference], nasdaq_df, low_df, max_cap)
+    results['raw'] = _agreement(reference_combined, combine_similarity(sim_text[backend], nasdaq_df, low_df, max_cap),
+                                top_ks, threshold)
+    calibrated = combine_similarity(apply_calibration(sim_text[backend], calibration), nasdaq_df, low_df, max_cap)
+    results['calibrated'] = _agreement(reference_combined, calibrated, top_ks, threshold)
+    return results
+
+
+def print_agreement(results, backend, reference, threshold=THRESHOLD):
+    print(f"{reference} 耗时: {results[f'{reference}_seconds']:.2f} 秒, "
+          f"{backend} 耗时: {results[f'{backend}_seconds']:.2f} 秒")
+    for label, key in (('未校准', 'raw'), (f"校准后（{results['calibration']}）", 'calibrated')):
+        metrics = results[key]
+        overlaps = ', '.join(f"{name}: {value:.3f}" for name, value in metrics.items() if name.endswith('_overlap'))
+        print(f"{label}: {overlaps}")
+        print(f"  阈值 {threshold} 下边集合 Jaccard: {metrics['threshold_jaccard']:.3f} "
+              f"({reference}: {metrics['reference_edges']} 条, {backend}: {metrics['backend_edges']} 条)")
+
+
+if __name__ == "__main__":
+    import argparse
+    from network_builder import NASDAQ_PATH, LOW_PRICE_PATH, load_companies, market_cap_scale
+
+    parser = argparse.ArgumentParser(description="评估快速文本相似度后端与 BERT 的一致性，或拟合校准映射")
+    parser.add_argument("--backend", default="tfidf", choices=list(TEXT_BACKENDS))
+    parser.add_argument("--reference", default=CALIBRATION_REFERENCE, choices=list(TEXT_BACKENDS))
+    parser.add_argument("--low-price", default=LOW_PRICE_PATH)
+    parser.add_argument("--calibration", default=CALIBRATION_PATH, help="校准文件")
+    parser.add_argument("--fit", action="store_true", help="拟合并保存 backend 到 reference 尺度的校准映射")
+    args = parser.parse_args()
+
+    nasdaq_df = load_companies(NASDAQ_PATH, 'nasdaq100')
+    low_df = load_companies(args.low_price, 'lowprice')
+    max_cap = market_cap_scale(nasdaq_df, low_df)
+
+    if args.fit:
+        calibrate_backend(nasdaq_df, low_df, args.backend, args.reference, calibration_path=args.calibration)
+        print(f"{args.backend} → {args.reference} 校准映射已保存到 {args.calibration}")
+    results = evaluate_backend_agreement(nasdaq_df, low_df, max_cap, args.backend, args.reference,
+                                         calibration_path=args.calibration)
+    print_agreement(results, args.backend, args.reference)
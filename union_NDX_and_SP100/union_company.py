@@ -1,6 +1,6 @@
 import pandas as pd
 
-def merge_index_companies():
+def merge_index_companies(output_file="merged_indices_2025-03-10.csv"):
     """合并 S&P100 和 NASDAQ100 的公司信息"""
     
     # 读取两个CSV文件
@@ -20,7 +20,6 @@ def merge_index_companies():
             unique_df = unique_df.sort_values(by='market_cap', ascending=False)
         
         # 保存结果
-        output_file = "merged_indices_2025-03-10.csv"
         unique_df.to_csv(output_file, index=False)
         
         # 打印统计信息